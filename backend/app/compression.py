@@ -0,0 +1,102 @@
+"""Compress JSON responses (brotli if the `brotli` package is installed and accepted, else gzip).
+
+Only complete application/json bodies at least minimum_size long are touched: streamed responses
+(NDJSON/SSE progress, audio) pass through unbuffered, and images/video are already compressed.
+A strong ETag becomes weak on the compressed representation (as nginx does), so If-None-Match still
+matches either form.
+"""
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import COMPRESS_MIN_BYTES
+
+try:
+    import brotli  # optional: pip install brotli
+except ImportError:
+    brotli = None
+
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Content codings the client accepts (q > 0), lower-cased."""
+    offered = set()
+    for part in accept_encoding.split(","):
+        coding, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    pass
+        if coding and q > 0:
+            offered.add(coding.lower())
+    return offered
+
+
+def _pick_encoding(accept_encoding: str) -> str | None:
+    offered = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in offered:
+        return "br"
+    if "gzip" in offered:
+        return "gzip"
+    return None
+
+
+class JSONCompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESS_MIN_BYTES, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _pick_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message  # held until we see the first body chunk
+                return
+            if start is None:
+                await send(message)
+                return
+            held, start = start, None
+            headers = MutableHeaders(raw=held["headers"])
+            body = message.get("body", b"")
+            media_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            if (
+                message["type"] != "http.response.body"
+                or message.get("more_body", False)
+                or media_type != "application/json"
+                or "content-encoding" in headers
+                or len(body) < self.minimum_size
+            ):
+                await send(held)
+                await send(message)
+                return
+            body = self._compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(held)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
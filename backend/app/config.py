@@ -7,3 +7,93 @@ def _get_key(name: str, default: str = "") -> str:
 
 POLLINATIONS_API_KEY = _get_key("POLLINATIONS_API_KEY")
 POLLINATIONS_BASE = os.environ.get("POLLINATIONS_BASE", "https://gen.pollinations.ai").strip()
+
+# Max concurrent image requests per story (episode images are fanned out in parallel)
+IMAGE_CONCURRENCY = max(1, int(os.environ.get("STORYTELL_IMAGE_CONCURRENCY", "4") or 4))
+
+# Shared HTTP client for Pollinations (keep-alive pool, optional HTTP/2 – needs `h2`)
+POLLINATIONS_HTTP2 = os.environ.get("POLLINATIONS_HTTP2", "").strip().lower() in ("1", "true", "yes")
+POLLINATIONS_MAX_CONNECTIONS = int(os.environ.get("POLLINATIONS_MAX_CONNECTIONS", "20") or 20)
+POLLINATIONS_MAX_KEEPALIVE = int(os.environ.get("POLLINATIONS_MAX_KEEPALIVE", "10") or 10)
+POLLINATIONS_KEEPALIVE_EXPIRY = float(os.environ.get("POLLINATIONS_KEEPALIVE_EXPIRY", "30") or 30)
+POLLINATIONS_CONNECT_TIMEOUT = float(os.environ.get("POLLINATIONS_CONNECT_TIMEOUT", "10") or 10)
+POLLINATIONS_CHAT_TIMEOUT = float(os.environ.get("POLLINATIONS_CHAT_TIMEOUT", "120") or 120)
+POLLINATIONS_IMAGE_TIMEOUT = float(os.environ.get("POLLINATIONS_IMAGE_TIMEOUT", "180") or 180)
+
+# In-memory cache of loaded stories (get_story), bounded by estimated size; 0 disables
+STORY_MEMORY_CACHE_MB = int(os.environ.get("STORYTELL_STORY_MEMORY_CACHE_MB", "64") or 0)
+
+# Story list thumbnail (longest side, px) generated once at save time
+THUMBNAIL_SIZE = int(os.environ.get("STORYTELL_THUMBNAIL_SIZE", "128") or 128)
+
+# Resized / re-encoded image variants (WebP/AVIF at standard widths), made on first request and cached on disk
+IMAGE_VARIANT_WIDTHS = tuple(
+    sorted(int(w) for w in os.environ.get("STORYTELL_IMAGE_WIDTHS", "256,512,768").split(",") if w.strip())
+)
+IMAGE_VARIANT_CACHE_DIR = os.environ.get("STORYTELL_IMAGE_CACHE_DIR", "").strip()
+IMAGE_VARIANT_CACHE_MAX_MB = int(os.environ.get("STORYTELL_IMAGE_CACHE_MB", "1024") or 1024)
+IMAGE_VARIANT_WORKERS = max(1, int(os.environ.get("STORYTELL_IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))) or 1))
+
+# Disk cache for episode TTS audio (keyed by hash of text + voice, LRU-evicted by total size)
+AUDIO_CACHE_DIR = os.environ.get("STORYTELL_AUDIO_CACHE_DIR", "").strip()
+AUDIO_CACHE_MAX_MB = int(os.environ.get("STORYTELL_AUDIO_CACHE_MB", "512") or 512)
+
+# Story chat completions for seeded requests (GenerateStoryRequest.seed), keyed by model + messages +
+# temperature + seed; entries expire after the TTL and are LRU-evicted by total size (0 MB = no cache)
+LLM_CACHE_DIR = os.environ.get("STORYTELL_LLM_CACHE_DIR", "").strip()
+LLM_CACHE_MAX_MB = int(os.environ.get("STORYTELL_LLM_CACHE_MB", "64") or 0)
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("STORYTELL_LLM_CACHE_TTL", str(7 * 86400)) or 0)
+
+# Video export jobs: encoder processes (each uses its own core) and where finished MP4s are kept
+VIDEO_EXPORT_WORKERS = max(1, int(os.environ.get("STORYTELL_VIDEO_WORKERS", "2") or 2))
+VIDEO_EXPORT_DIR = os.environ.get("STORYTELL_EXPORT_DIR", "").strip()
+VIDEO_EXPORT_TTL_SECONDS = int(os.environ.get("STORYTELL_EXPORT_TTL", "3600") or 3600)
+# Video encoder: "ffmpeg" (direct slideshow encode, falls back to moviepy) or "moviepy"
+VIDEO_ENCODER = os.environ.get("STORYTELL_VIDEO_ENCODER", "ffmpeg").strip().lower() or "ffmpeg"
+VIDEO_STILL_FPS = int(os.environ.get("STORYTELL_VIDEO_STILL_FPS", "2") or 2)
+# Exported MP4s + per-episode encoded segments, evicted least-recently-used by total size
+VIDEO_CACHE_DIR = os.environ.get("STORYTELL_VIDEO_CACHE_DIR", "").strip()
+VIDEO_CACHE_MAX_MB = int(os.environ.get("STORYTELL_VIDEO_CACHE_MB", "2048") or 2048)
+
+# Resilience for Pollinations calls (see app.services.resilience)
+POLLINATIONS_MAX_RETRIES = int(os.environ.get("POLLINATIONS_MAX_RETRIES", "2") or 0)
+POLLINATIONS_BACKOFF_BASE = float(os.environ.get("POLLINATIONS_BACKOFF_BASE", "0.5") or 0.5)
+POLLINATIONS_BACKOFF_MAX = float(os.environ.get("POLLINATIONS_BACKOFF_MAX", "20") or 20)
+# Hedging sends a duplicate image request when the first is slower than the recent latency percentile
+POLLINATIONS_HEDGE = os.environ.get("POLLINATIONS_HEDGE", "").strip().lower() in ("1", "true", "yes")
+POLLINATIONS_HEDGE_PERCENTILE = float(os.environ.get("POLLINATIONS_HEDGE_PERCENTILE", "0.95") or 0.95)
+POLLINATIONS_HEDGE_MIN_DELAY = float(os.environ.get("POLLINATIONS_HEDGE_MIN_DELAY", "5") or 5)
+POLLINATIONS_BREAKER_THRESHOLD = int(os.environ.get("POLLINATIONS_BREAKER_THRESHOLD", "5") or 5)
+POLLINATIONS_BREAKER_RESET = float(os.environ.get("POLLINATIONS_BREAKER_RESET", "30") or 30)
+
+# Process-wide upstream scheduler (see app.services.scheduler): concurrency + adaptive rate per pool.
+# Pools: "chat" and one per image model ("image:flux", "image:zimage"). Rate 0 = no rate limit.
+SCHED_CHAT_CONCURRENCY = int(os.environ.get("STORYTELL_SCHED_CHAT_CONCURRENCY", "4") or 4)
+SCHED_IMAGE_CONCURRENCY = int(os.environ.get("STORYTELL_SCHED_IMAGE_CONCURRENCY", "8") or 8)
+SCHED_CHAT_RPS = float(os.environ.get("STORYTELL_SCHED_CHAT_RPS", "1") or 0)
+SCHED_IMAGE_RPS = float(os.environ.get("STORYTELL_SCHED_IMAGE_RPS", "2") or 0)
+SCHED_BURST = float(os.environ.get("STORYTELL_SCHED_BURST", "4") or 4)
+
+# Admission control for story generation (see app.services.admission)
+GEN_MAX_ACTIVE = int(os.environ.get("STORYTELL_GEN_MAX_ACTIVE", "8") or 8)
+GEN_MAX_PER_CLIENT = int(os.environ.get("STORYTELL_GEN_MAX_PER_CLIENT", "2") or 2)
+GEN_MAX_QUEUE = int(os.environ.get("STORYTELL_GEN_MAX_QUEUE", "32") or 0)
+GEN_QUEUE_TIMEOUT = float(os.environ.get("STORYTELL_GEN_QUEUE_TIMEOUT", "30") or 30)
+# Use the first X-Forwarded-For address as the client id (only behind a trusted proxy)
+TRUST_FORWARDED_FOR = os.environ.get("STORYTELL_TRUST_FORWARDED_FOR", "").lower() in ("1", "true", "yes")
+
+# HTTP caching / compression
+# Saved stories never change: clients and CDNs may reuse GET /api/story/{id} for this long without asking
+STORY_CACHE_MAX_AGE = int(os.environ.get("STORYTELL_STORY_CACHE_MAX_AGE", "86400") or 0)
+# JSON responses at least this large are gzip/brotli-compressed when the client accepts it
+COMPRESS_MIN_BYTES = int(os.environ.get("STORYTELL_COMPRESS_MIN_BYTES", "1024") or 1024)
+
+# Batch generation (POST /api/story/batch, see app.services.batch_jobs): shared worker pool at background
+# upstream priority. Rate = stories started per minute across all batches (0 = only bounded by workers).
+BATCH_WORKERS = max(1, int(os.environ.get("STORYTELL_BATCH_WORKERS", "2") or 2))
+BATCH_RATE_PER_MIN = float(os.environ.get("STORYTELL_BATCH_RATE_PER_MIN", "10") or 0)
+BATCH_MAX_PENDING = int(os.environ.get("STORYTELL_BATCH_MAX_PENDING", "2000") or 2000)
+# Finished stories are written in one transaction per BATCH_FLUSH_SIZE stories (or every BATCH_FLUSH_SECONDS)
+BATCH_FLUSH_SIZE = max(1, int(os.environ.get("STORYTELL_BATCH_FLUSH_SIZE", "10") or 10))
+BATCH_FLUSH_SECONDS = float(os.environ.get("STORYTELL_BATCH_FLUSH_SECONDS", "5") or 5)
+BATCH_TTL_SECONDS = int(os.environ.get("STORYTELL_BATCH_TTL", "86400") or 86400)
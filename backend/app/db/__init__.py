@@ -1,9 +1,9 @@
-from app.db.database import init_db_sync, get_db_path
+from app.db.database import init_db_sync, get_db_path, get_connection
 
 def init_db():
     """Sync init; call from lifespan (fast)."""
     init_db_sync()
 
-from app.db.repository import StoryRepository
+from app.db.repository import StoryRepository, image_url, encode_cursor
 
-__all__ = ["init_db", "get_db_path", "StoryRepository"]
+__all__ = ["init_db", "get_db_path", "get_connection", "StoryRepository", "image_url", "encode_cursor"]
@@ -0,0 +1,78 @@
+"""Thread-safe in-memory LRU bounded by total (estimated) bytes rather than entry count."""
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Optional
+
+from app.metrics import CACHE_EVICTIONS, CACHE_REQUESTS
+
+
+class ByteLRU:
+    """put(key, value, size) / get(key); least recently used entries are dropped once the sizes
+    sum past max_bytes. Values larger than max_bytes are not cached. max_bytes = 0 disables the cache."""
+
+    def __init__(self, max_bytes: int, name: str = "memory"):
+        self.max_bytes = max_bytes
+        self.name = name  # metrics label
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+        CACHE_REQUESTS.inc(cache=self.name, result="miss" if entry is None else "hit")
+        return None if entry is None else entry[0]
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Membership only: no hit/miss counted, recency unchanged."""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key: Hashable, value: Any, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        evicted = 0
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[key] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, dropped) = self._entries.popitem(last=False)
+                self.bytes -= dropped
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted, cache=self.name)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -1,20 +1,57 @@
 """SQLite setup and schema (sync sqlite3, use from async via to_thread)."""
 import os
 import sqlite3
+import threading
 from pathlib import Path
 
 DB_DIR = Path(os.environ.get("STORYTELL_DB_DIR", "./data"))
 DB_PATH = DB_DIR / "stories.db"
 
+# Per-connection tuning: WAL lets readers run alongside the writer; NORMAL sync is durable in WAL mode
+# except for the last transactions on power loss. cache_size < 0 is KiB.
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{int(os.environ.get('STORYTELL_SQLITE_CACHE_KB', '32768') or 32768)}",
+    f"PRAGMA mmap_size={int(os.environ.get('STORYTELL_SQLITE_MMAP_BYTES', str(256 * 1024 * 1024)) or 0)}",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# One cached connection per (thread, db path); to_thread workers are a bounded pool so this stays small
+_local = threading.local()
+
 
 def get_db_path() -> Path:
     return DB_PATH
 
 
+def get_connection(path: str | Path | None = None) -> sqlite3.Connection:
+    """Return this thread's cached, tuned connection to the DB (opened on first use)."""
+    key = str(path or DB_PATH)
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(key)
+    if conn is None:
+        conn = sqlite3.connect(key)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conns[key] = conn
+    return conn
+
+
+def _add_column_if_missing(conn: sqlite3.Connection, table: str, column: str, decl: str) -> None:
+    """Lightweight migration for DBs created before the column existed."""
+    cols = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if column not in cols:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
 def init_db_sync() -> None:
     """Create data dir and tables if not exist."""
     DB_DIR.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection(DB_PATH)
     conn.execute("""
         CREATE TABLE IF NOT EXISTS stories (
             id TEXT PRIMARY KEY,
@@ -35,6 +72,19 @@ def init_db_sync() -> None:
             FOREIGN KEY (story_id) REFERENCES stories(id)
         )
     """)
+    # Content-addressed image blobs (key = sha256 of bytes); episodes reference them by image_hash
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS images (
+            hash TEXT PRIMARY KEY,
+            content_type TEXT NOT NULL,
+            data BLOB NOT NULL,
+            created_at TEXT NOT NULL
+        )
+    """)
+    _add_column_if_missing(conn, "episodes", "image_hash", "TEXT")
+    _add_column_if_missing(conn, "stories", "thumbnail_hash", "TEXT")
+    # get_story: seek by story_id in ordinal order; list_stories: newest-first scan + first-episode lookup
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_episodes_story_ordinal ON episodes(story_id, ordinal, image_hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stories_created ON stories(created_at, id)")
     conn.commit()
-    conn.close()
     print(f"[StoryTale] SQLite initialized at {DB_PATH}")
@@ -1,65 +1,178 @@
 """Story repository - save/load/list from SQLite (sync, wrap in to_thread when needed)."""
+import base64
+import hashlib
+import json
 import sqlite3
+import sys
 import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
-from app.db.database import get_db_path
+from app.config import STORY_MEMORY_CACHE_MB
+from app.db.cache import ByteLRU
+from app.db.database import get_db_path, get_connection
+from app.metrics import timed
 from app.models import EpisodeOut
 
 
+# Images are served by GET /api/image/{hash} (see app.main)
+IMAGE_URL_PREFIX = "/api/image/"
+
+
 def _row_factory(cursor, row):
     return dict(zip([c[0] for c in cursor.description], row))
 
 
+def image_url(image_hash: Optional[str], legacy_url: Optional[str] = None) -> str:
+    """URL for an episode image: blob endpoint if stored by hash, else legacy data URL (older rows)."""
+    if image_hash:
+        return f"{IMAGE_URL_PREFIX}{image_hash}"
+    return legacy_url or ""
+
+
+def encode_cursor(created_at: str, story_id: str) -> str:
+    """Opaque list cursor for keyset pagination: position after (created_at, id)."""
+    raw = json.dumps([created_at, story_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, story_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(created_at, str) or not isinstance(story_id, str):
+        raise ValueError("Invalid cursor")
+    return created_at, story_id
+
+
+def _sniff_content_type(data: bytes) -> str:
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+# PRAGMA user_version once backfill_legacy_images has run: rows saved since never hold data URLs
+LEGACY_IMAGES_BACKFILLED = 1
+
+# Loaded stories, shared by all repositories in the process; key = (db path, story id).
+# Every write to a story must invalidate its entry (see save_story).
+story_cache = ByteLRU(STORY_MEMORY_CACHE_MB * 1024 * 1024, name="story")
+
+
+def _story_size(story: dict) -> int:
+    """Rough in-memory size of a get_story result (strings dominate: legacy rows hold data URLs)."""
+    size = 512 + sum(sys.getsizeof(v) for v in story.values() if isinstance(v, str))
+    for ep in story["episodes"]:
+        size += 256 + sys.getsizeof(ep.text) + sys.getsizeof(ep.imageUrl)
+    return size
+
+
 class StoryRepository:
     def __init__(self, db_path: Optional[str] = None):
         self._path = db_path or str(get_db_path())
 
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread cached connection (see app.db.database.get_connection)."""
+        return get_connection(self._path)
+
+    def _query(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        """Execute a read with dict rows (row_factory set per cursor, connection is shared)."""
+        cur = self._conn().cursor()
+        cur.row_factory = _row_factory
+        return cur.execute(sql, params)
+
     def save_story(
         self,
         story_id: str,
         topic: str,
         title: str,
         num_episodes: int,
-        episodes: list[tuple[str, str, Optional[str]]],
+        episodes: list[tuple[str, Optional[str], Optional[str]]],
+        thumbnail_hash: Optional[str] = None,
     ) -> None:
-        """episodes: list of (text, image_url, image_prompt)."""
+        """episodes: list of (text, image_hash or None, image_prompt); images are stored first with put_image.
+        thumbnail_hash: small image for the story list (see put_image)."""
+        self.save_stories([{
+            "story_id": story_id,
+            "topic": topic,
+            "title": title,
+            "num_episodes": num_episodes,
+            "episodes": episodes,
+            "thumbnail_hash": thumbnail_hash,
+        }])
+        print(f"[StoryTale] Saved story {story_id} with {len(episodes)} episodes")
+
+    @timed("db_write")
+    def save_stories(self, stories: list[dict]) -> None:
+        """Insert many stories in one transaction (all or none). Each dict has save_story's keyword args."""
         now = datetime.now(timezone.utc).isoformat()
-        conn = sqlite3.connect(self._path)
-        conn.execute(
-            "INSERT INTO stories (id, topic, title, num_episodes, created_at) VALUES (?, ?, ?, ?, ?)",
-            (story_id, topic, title, num_episodes, now),
-        )
-        for i, (text, image_url, image_prompt) in enumerate(episodes):
+        with self._conn() as conn:  # one transaction; rolls back on error
+            conn.executemany(
+                "INSERT INTO stories (id, topic, title, num_episodes, created_at, thumbnail_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (s["story_id"], s["topic"], s["title"], s["num_episodes"], now, s.get("thumbnail_hash"))
+                    for s in stories
+                ],
+            )
+            conn.executemany(
+                "INSERT INTO episodes (story_id, ordinal, text, image_url, image_prompt, image_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (s["story_id"], i, text, "", image_prompt or "", image_hash)
+                    for s in stories
+                    for i, (text, image_hash, image_prompt) in enumerate(s["episodes"])
+                ],
+            )
+        for s in stories:  # after commit, so a concurrent read can't re-cache old rows
+            story_cache.invalidate((self._path, s["story_id"]))
+
+    @timed("db_write")
+    def put_image(self, data: bytes) -> str:
+        """Store image bytes once (content-addressed); return the hash. Safe to call for existing images."""
+        image_hash = self.image_key(data)
+        with self._conn() as conn:
             conn.execute(
-                "INSERT INTO episodes (story_id, ordinal, text, image_url, image_prompt) VALUES (?, ?, ?, ?, ?)",
-                (story_id, i, text, image_url, image_prompt or ""),
+                "INSERT OR IGNORE INTO images (hash, content_type, data, created_at) VALUES (?, ?, ?, ?)",
+                (image_hash, _sniff_content_type(data), data, datetime.now(timezone.utc).isoformat()),
             )
-        conn.commit()
-        conn.close()
-        print(f"[StoryTale] Saved story {story_id} with {len(episodes)} episodes")
+        return image_hash
 
     def get_story(self, story_id: str) -> Optional[dict]:
-        """Return { title, topic, num_episodes, created_at, episodes: [EpisodeOut] } or None."""
-        conn = sqlite3.connect(self._path)
-        conn.row_factory = _row_factory
-        cur = conn.execute(
+        """Return { title, topic, num_episodes, created_at, episodes: [EpisodeOut] } or None.
+        Read-through story_cache; callers get their own dict/list (episodes are shared, treat as read-only)."""
+        key = (self._path, story_id)
+        story = story_cache.get(key)
+        if story is None:
+            story = self._load_story(story_id)
+            if story is None:
+                return None
+            story_cache.put(key, story, _story_size(story))
+        return {**story, "episodes": list(story["episodes"])}
+
+    def story_exists(self, story_id: str) -> bool:
+        """Cheap existence check: story cache, else a primary-key lookup (no episode rows read)."""
+        if (self._path, story_id) in story_cache:
+            return True
+        return self._conn().execute("SELECT 1 FROM stories WHERE id = ?", (story_id,)).fetchone() is not None
+
+    @timed("db_read")
+    def _load_story(self, story_id: str) -> Optional[dict]:
+        story_row = self._query(
             "SELECT id, topic, title, num_episodes, created_at FROM stories WHERE id = ?",
             (story_id,),
-        )
-        story_row = cur.fetchone()
+        ).fetchone()
         if not story_row:
-            conn.close()
             return None
-        cur = conn.execute(
-            "SELECT ordinal, text, image_url FROM episodes WHERE story_id = ? ORDER BY ordinal",
+        rows = self._query(
+            "SELECT ordinal, text, image_url, image_hash FROM episodes WHERE story_id = ? ORDER BY ordinal",
             (story_id,),
-        )
-        rows = cur.fetchall()
-        conn.close()
+        ).fetchall()
         episodes = [
-            EpisodeOut(text=r["text"], imageUrl=r["image_url"])
+            EpisodeOut(text=r["text"], imageUrl=image_url(r["image_hash"], r["image_url"]))
             for r in rows
         ]
         return {
@@ -71,18 +184,28 @@ class StoryRepository:
             "episodes": episodes,
         }
 
-    def list_stories(self, limit: int = 20, offset: int = 0) -> list[dict]:
-        """Return list of { storyId, topic, title, num_episodes, created_at, first_episode_image_url }."""
-        conn = sqlite3.connect(self._path)
-        conn.row_factory = _row_factory
-        cur = conn.execute(
-            """SELECT s.id, s.topic, s.title, s.num_episodes, s.created_at,
-                      (SELECT e.image_url FROM episodes e WHERE e.story_id = s.id ORDER BY e.ordinal LIMIT 1) AS first_episode_image_url
-               FROM stories s ORDER BY s.created_at DESC LIMIT ? OFFSET ?""",
-            (limit, offset),
-        )
-        rows = cur.fetchall()
-        conn.close()
+    @timed("db_read")
+    def list_stories(self, limit: int = 20, offset: int = 0, cursor: Optional[str] = None) -> list[dict]:
+        """Return list of { storyId, topic, title, num_episodes, created_at, first_episode_image_url, thumbnail_url }.
+        cursor (from encode_cursor) seeks past the given row via the (created_at, id) index; otherwise offset is used.
+        Raises ValueError for a malformed cursor."""
+        select = """SELECT s.id, s.topic, s.title, s.num_episodes, s.created_at, s.thumbnail_hash,
+                      (SELECT CASE WHEN e.image_hash IS NOT NULL THEN ? || e.image_hash
+                                   WHEN e.image_url LIKE 'data:%' THEN NULL ELSE e.image_url END
+                       FROM episodes e WHERE e.story_id = s.id ORDER BY e.ordinal LIMIT 1) AS first_episode_image_url
+               FROM stories s"""
+        if cursor:
+            created_at, story_id = decode_cursor(cursor)
+            rows = self._query(
+                f"""{select} WHERE (s.created_at, s.id) < (?, ?)
+                    ORDER BY s.created_at DESC, s.id DESC LIMIT ?""",
+                (IMAGE_URL_PREFIX, created_at, story_id, limit),
+            ).fetchall()
+        else:
+            rows = self._query(
+                f"{select} ORDER BY s.created_at DESC, s.id DESC LIMIT ? OFFSET ?",
+                (IMAGE_URL_PREFIX, limit, offset),
+            ).fetchall()
         return [
             {
                 "storyId": r["id"],
@@ -91,10 +214,94 @@ class StoryRepository:
                 "num_episodes": r["num_episodes"],
                 "created_at": r["created_at"],
                 "first_episode_image_url": r.get("first_episode_image_url") or None,
+                "thumbnail_url": image_url(r["thumbnail_hash"]) or None,
             }
             for r in rows
         ]
 
+    def backfill_legacy_images(self, batch: int = 100) -> tuple[int, int]:
+        """One-time upgrade of rows saved before image blobs/thumbnails: move data URL images into the images
+        table (episodes.image_hash) and make missing story thumbnails. Runs once per database (recorded in
+        PRAGMA user_version), later calls return at once; sync and possibly slow on the first run – call via
+        to_thread at startup. Returns (images, thumbnails)."""
+        from app.services.thumbnails import make_thumbnail
+
+        conn = self._conn()
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= LEGACY_IMAGES_BACKFILLED:
+            return 0, 0
+        now = datetime.now(timezone.utc).isoformat()
+        moved = 0
+        while True:
+            rows = conn.execute(
+                "SELECT id, image_url FROM episodes WHERE image_hash IS NULL AND image_url LIKE 'data:image%' LIMIT ?",
+                (batch,),
+            ).fetchall()
+            if not rows:
+                break
+            with conn:
+                for episode_id, url in rows:
+                    try:
+                        data = base64.b64decode(url.split(",", 1)[1])
+                    except (IndexError, ValueError):
+                        data = b""
+                    image_hash = self.image_key(data) if data else None
+                    if image_hash:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO images (hash, content_type, data, created_at) VALUES (?, ?, ?, ?)",
+                            (image_hash, _sniff_content_type(data), data, now),
+                        )
+                    # undecodable data URLs are dropped (they never displayed either)
+                    conn.execute("UPDATE episodes SET image_hash = ?, image_url = '' WHERE id = ?", (image_hash, episode_id))
+            moved += len(rows)
+
+        thumbnails = 0
+        missing = conn.execute(
+            """SELECT s.id, (SELECT e.image_hash FROM episodes e WHERE e.story_id = s.id AND e.image_hash IS NOT NULL
+                             ORDER BY e.ordinal LIMIT 1) AS first_hash
+               FROM stories s WHERE s.thumbnail_hash IS NULL"""
+        ).fetchall()
+        for story_id, first_hash in missing:
+            image = self.get_image(first_hash) if first_hash else None
+            thumbnail = make_thumbnail(image[0]) if image else None
+            if thumbnail:
+                thumbnail_hash = self.put_image(thumbnail)
+                with conn:
+                    conn.execute("UPDATE stories SET thumbnail_hash = ? WHERE id = ?", (thumbnail_hash, story_id))
+                thumbnails += 1
+        with conn:
+            conn.execute(f"PRAGMA user_version = {LEGACY_IMAGES_BACKFILLED}")
+        if moved or thumbnails:
+            story_cache.clear()
+            print(f"[StoryTale] Backfilled {moved} legacy episode images and {thumbnails} story thumbnails")
+        return moved, thumbnails
+
+    @timed("db_read")
+    def get_image(self, image_hash: str) -> Optional[tuple[bytes, str]]:
+        """Return (bytes, content_type) for a stored image, or None."""
+        row = self._conn().execute("SELECT data, content_type FROM images WHERE hash = ?", (image_hash,)).fetchone()
+        if not row:
+            return None
+        return bytes(row[0]), row[1]
+
+    def image_exists(self, image_hash: str) -> bool:
+        """Primary-key lookup only (the blob is not read)."""
+        return self._conn().execute("SELECT 1 FROM images WHERE hash = ?", (image_hash,)).fetchone() is not None
+
+    @timed("db_read")
+    def get_image_by_url(self, url: str) -> Optional[bytes]:
+        """Raw image bytes for an episode imageUrl (blob URL or legacy data URL)."""
+        if url.startswith(IMAGE_URL_PREFIX):
+            img = self.get_image(url[len(IMAGE_URL_PREFIX):])
+            return img[0] if img else None
+        if url.startswith("data:image"):
+            return base64.b64decode(url.split(",", 1)[1])
+        return None
+
+    @staticmethod
+    def image_key(data: bytes) -> str:
+        """Content hash used as the image blob key (and ETag)."""
+        return hashlib.sha256(data).hexdigest()
+
     @staticmethod
     def new_id() -> str:
         return str(uuid.uuid4())
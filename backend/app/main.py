@@ -1,27 +1,56 @@
 """StoryTale FastAPI app."""
 import asyncio
+import json
+import re
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
 
-from app.db import init_db, StoryRepository
+from app import metrics
+from app.compression import JSONCompressionMiddleware
+from app.config import STORY_CACHE_MAX_AGE
+from app.responses import FastJSONResponse
+from app.static_files import StaticIndex
+from app.db import init_db, StoryRepository, encode_cursor
+from app.db.repository import story_cache
 from app.models import (
     GenerateStoryRequest,
     GenerateStoryResponse,
     StoryListItem,
     GetStoryResponse,
     ExportVideoRequest,
+    ExportJobResponse,
+    BatchGenerateRequest,
+    BatchItemResponse,
+    BatchJobResponse,
 )
 from app.services import StoryService
+from app.services.admission import AdmissionController, AdmissionRejected, client_key
+from app.services.batch_jobs import BatchFull, BatchJob, BatchManager, ItemStatus
+from app.services.export_jobs import ExportJob, ExportJobManager
+from app.services.image_variants import MEDIA_TYPES, image_variants, negotiate_format, snap_width
+from app.services.pollinations import open_client, close_client
+from app.services.resilience import add_listener
+from app.services.scheduler import scheduler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     init_db()
-    yield
+    await asyncio.to_thread(repo.backfill_legacy_images)  # first start on an older DB only (PRAGMA user_version)
+    static_index.build()
+    await open_client()
+    try:
+        yield
+    finally:
+        await batch_jobs.shutdown()
+        export_jobs.shutdown()
+        image_variants.shutdown()
+        await close_client()
 
 
 app = FastAPI(
@@ -37,21 +66,59 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
+app.add_middleware(JSONCompressionMiddleware)
 
 repo = StoryRepository()
 story_service = StoryService(repo)
+export_jobs = ExportJobManager(repo)
+batch_jobs = BatchManager(story_service, repo)
+admission = AdmissionController()
+
+# Metrics: upstream decisions from the resilience layer + gauges read at scrape time
+add_listener(lambda event, endpoint, info: metrics.UPSTREAM_EVENTS.inc(endpoint=endpoint, event=event))
+metrics.Gauge(
+    "storytale_generations", "Story generations by state", ["state"],
+    fn=lambda: {(state,): admission.stats()[state] for state in ("active", "queued")},
+)
+metrics.Gauge(
+    "storytale_story_cache", "In-memory story cache: entries, bytes, max_bytes", ["field"],
+    fn=lambda: {(field,): v for field, v in story_cache.stats().items() if field in ("entries", "bytes", "max_bytes")},
+)
+metrics.Gauge(
+    "storytale_export_jobs", "Video export jobs by status", ["status"],
+    fn=lambda: {(status,): n for status, n in export_jobs.stats().items()},
+)
+metrics.Gauge(
+    "storytale_batch_items", "Batch generation items by status", ["status"],
+    fn=lambda: {(status,): n for status, n in batch_jobs.stats().items()},
+)
+metrics.Gauge(
+    "storytale_upstream_pool", "Upstream scheduler pools: active slots, waiting callers, rate (req/s)", ["pool", "field"],
+    fn=lambda: {(pool, field): v for pool, s in scheduler.stats().items() for field, v in s.items()},
+)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 # โฟลเดอร์ static (เว็บที่ build แล้ว) – ใน Docker อยู่ที่ /app/static
 STATIC_DIR = Path(__file__).resolve().parent.parent / "static"
+static_index = StaticIndex(STATIC_DIR)  # built in lifespan
 
 
 @app.get("/")
-def root():
+def root(request: Request):
     """Root: serve หน้าเว็บ (index.html) ถ้ามี build แล้ว ไม่ก็คืน API info."""
-    index_html = STATIC_DIR / "index.html"
-    if index_html.is_file():
-        return FileResponse(index_html, media_type="text/html")
+    index_html = static_index.get("index.html")
+    if index_html is not None:
+        return static_index.response(index_html, request)
     return {
         "app": "StoryTale API",
         "docs": "/docs",
@@ -67,36 +134,224 @@ def favicon():
 
 
 @app.get("/health")
-def health():
-    return {"status": "ok"}
+async def health():
+    """Liveness + generation load (active/queued) for autoscaling. async: admission state is read on the loop."""
+    return {"status": "ok", "generation": admission.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition (stage latencies, upstream errors, cache hits, in-flight work).
+    async: the gauges read admission, scheduler and job state that only the event loop mutates."""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 
 @app.post("/api/story/generate", response_model=GenerateStoryResponse)
-async def generate_story(body: GenerateStoryRequest):
-    """Generate story via Pollinations, save to SQLite, return storyId + episodes."""
-    return await story_service.generate(
-        body.topic, body.num_episodes, body.story_lang, body.image_model, body.image_style
+async def generate_story(body: GenerateStoryRequest, request: Request):
+    """Generate story via Pollinations, save to SQLite, return storyId + episodes.
+    Over capacity: 429 (this client has too many in flight) or 503 (queue full/timed out) with Retry-After."""
+    ticket = await admission.acquire(client_key(request))
+    try:
+        result = await story_service.generate(
+            body.topic, body.num_episodes, body.story_lang, body.image_model, body.image_style, seed=body.seed
+        )
+        return FastJSONResponse(result)  # built by the service: no second validation pass
+    finally:
+        ticket.release()
+
+
+@app.post("/api/story/generate/stream")
+async def generate_story_stream(body: GenerateStoryRequest, request: Request):
+    """Like /api/story/generate, but streams progress: a "story" event (storyId, title) as soon as the
+    story text is ready, an "episode" event per episode as its image finishes, then "saved".
+    NDJSON by default; Server-Sent Events if the client sends Accept: text/event-stream.
+    On failure the last event is {"event": "error", "detail": ...}.
+    Admission is decided before the stream starts (same 429/503 as /api/story/generate)."""
+    ticket = await admission.acquire(client_key(request))
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    def encode(event: dict) -> str:
+        data = json.dumps(event, ensure_ascii=False)
+        return f"event: {event['event']}\ndata: {data}\n\n" if sse else data + "\n"
+
+    async def events():
+        try:
+            async for event in story_service.generate_events(
+                body.topic, body.num_episodes, body.story_lang, body.image_model, body.image_style, seed=body.seed
+            ):
+                yield encode(event)
+        except Exception as e:
+            print(f"[StoryTale] generate stream error: {e}")
+            yield encode({"event": "error", "detail": "Story generation failed"})
+        finally:
+            ticket.release()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+        # Also released if the stream never runs (client gone before the body started)
+        background=BackgroundTask(ticket.release),
+    )
+
+
+def _batch_response(job: BatchJob) -> BatchJobResponse:
+    return BatchJobResponse(
+        batchId=job.id,
+        status=job.status,
+        total=len(job.items),
+        counts=job.counts(),
+        progress=job.progress,
+        itemsUrl=f"/api/story/batch/{job.id}/items",
     )
 
 
+def _batch_item_response(item) -> BatchItemResponse:
+    return BatchItemResponse(
+        index=item.index,
+        topic=item.request.topic,
+        story_lang=item.request.story_lang,
+        status=item.status,
+        progress=item.progress,
+        storyId=item.story_id,
+        title=item.title,
+        error=item.error,
+    )
+
+
+def _get_batch(batch_id: str) -> BatchJob:
+    job = batch_jobs.get(batch_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return job
+
+
+@app.post("/api/story/batch", response_model=BatchJobResponse, status_code=202)
+async def generate_batch(body: BatchGenerateRequest):
+    """Queue many stories (1-500) for background generation; returns a batchId at once.
+    Items run in a shared worker pool at STORYTELL_BATCH_RATE_PER_MIN, below interactive requests in the
+    upstream scheduler, and are saved in bulk. Poll GET /api/story/batch/{batchId}; 503 if the queue is full."""
+    try:
+        job = batch_jobs.submit(body.items)
+    except BatchFull as e:
+        raise HTTPException(status_code=503, detail=f"Batch queue is full: {e}")
+    return _batch_response(job)
+
+
+@app.get("/api/story/batch/{batch_id}", response_model=BatchJobResponse)
+def get_batch(batch_id: str):
+    """Batch progress: item counts per status (queued/running/saving/done/failed)."""
+    return _batch_response(_get_batch(batch_id))
+
+
+@app.get("/api/story/batch/{batch_id}/items", response_model=list[BatchItemResponse])
+def get_batch_items(
+    batch_id: str,
+    status: ItemStatus | None = Query(None, description="queued, running, saving, done or failed"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+):
+    """Per-item status (storyId once saved), in submission order; optionally only one status."""
+    items = [item for item in _get_batch(batch_id).items if status is None or item.status == status]
+    return [_batch_item_response(item) for item in items[offset:offset + limit]]
+
+
+@app.get("/api/story/batch/{batch_id}/items/{index}", response_model=BatchItemResponse)
+def get_batch_item(batch_id: str, index: int):
+    """Status of one item (index in the submitted list)."""
+    items = _get_batch(batch_id).items
+    if not 0 <= index < len(items):
+        raise HTTPException(status_code=404, detail="Batch item not found")
+    return _batch_item_response(items[index])
+
+
+# Saved stories are immutable, so the ETag needs no DB read; bump the version when the response shape changes
+STORY_REPRESENTATION_VERSION = 1
+STORY_CACHE_CONTROL = f"public, max-age={STORY_CACHE_MAX_AGE}, immutable"
+
+
 @app.get("/api/story/{story_id}", response_model=GetStoryResponse)
-async def get_story(story_id: str):
-    """Load story by id from SQLite."""
+async def get_story(story_id: str, request: Request):
+    """Load story by id from SQLite. Strong ETag + long-lived caching; If-None-Match -> 304 after only an
+    existence check (story cache or primary-key lookup), so an unknown id is still 404."""
+    etag = f'"story-{story_id}-v{STORY_REPRESENTATION_VERSION}"'
+    headers = {"ETag": etag, "Cache-Control": STORY_CACHE_CONTROL}
+    if etag in request.headers.get("if-none-match", "") and await asyncio.to_thread(repo.story_exists, story_id):
+        return Response(status_code=304, headers=headers)
     story = await asyncio.to_thread(repo.get_story, story_id)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
-    return story
+    return FastJSONResponse(story, headers=headers)  # trusted repository data: skip response_model validation
+
+
+_IMAGE_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+# Image blobs are content-addressed: the URL never changes meaning, so cache forever
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@app.get("/api/image/{image_hash}")
+async def get_image(
+    image_hash: str,
+    request: Request,
+    w: int | None = None,
+    fmt: str | None = Query(None, alias="format"),
+):
+    """Serve a stored image blob by content hash (strong ETag, immutable caching; 304 only for a stored hash).
+    ?w= : resized to the nearest standard width >= w. ?format=avif|webp|jpeg, else AVIF/WebP if the
+    Accept header allows it. Variants are encoded on first request and cached on disk."""
+    if not _IMAGE_HASH_RE.match(image_hash):
+        raise HTTPException(status_code=404, detail="Image not found")
+    width = snap_width(w)
+    out_fmt = negotiate_format(request.headers.get("accept", ""), fmt)
+    if width and out_fmt is None:
+        out_fmt = "jpeg"
+    variant = f"-{width or 0}-{out_fmt}" if out_fmt else ""
+    etag = f'"{image_hash}{variant}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if not fmt:
+        headers["Vary"] = "Accept"
+    if etag in request.headers.get("if-none-match", "") and await asyncio.to_thread(repo.image_exists, image_hash):
+        return Response(status_code=304, headers=headers)
+    if out_fmt:
+        async def load_original() -> bytes | None:
+            img = await asyncio.to_thread(repo.get_image, image_hash)
+            return img[0] if img else None
+
+        path = await image_variants.get(image_hash, width, out_fmt, load_original)
+        if path is not None:
+            return FileResponse(path, media_type=MEDIA_TYPES[out_fmt], headers=headers)
+        headers["ETag"] = f'"{image_hash}"'  # variant failed: serve the original
+    img = await asyncio.to_thread(repo.get_image, image_hash)
+    if not img:
+        raise HTTPException(status_code=404, detail="Image not found")
+    data, content_type = img
+    return Response(content=data, media_type=content_type, headers=headers)
 
 
 @app.get("/api/stories", response_model=list[StoryListItem])
-async def list_stories(limit: int = 20, offset: int = 0):
-    """List stories (newest first)."""
-    return await asyncio.to_thread(repo.list_stories, limit, offset)
+async def list_stories(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: str | None = None,
+):
+    """List stories (newest first). Pass the X-Next-Cursor header value as ?cursor= for the next page
+    (keyset pagination, stable under inserts); offset still works but gets slower on deep pages."""
+    try:
+        stories = await asyncio.to_thread(repo.list_stories, limit, offset, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    headers = {}
+    if len(stories) == limit:
+        last = stories[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["created_at"], last["storyId"])
+    return FastJSONResponse(stories, headers=headers)
 
 
 @app.get("/api/story/{story_id}/episode/{index}/audio")
-async def get_episode_audio(story_id: str, index: int):
-    """Generate TTS audio for one episode (Edge TTS), return MP3."""
+async def get_episode_audio(story_id: str, index: int, request: Request, stream: bool = True):
+    """TTS audio for one episode (Edge TTS, cached on disk), return MP3.
+    Cache hit: file with ETag + Range support. Miss: streamed as Edge TTS produces it
+    (stream=false waits for full synthesis instead)."""
     story = await asyncio.to_thread(repo.get_story, story_id)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
@@ -107,44 +362,70 @@ async def get_episode_audio(story_id: str, index: int):
     text = ep.get("text", "") if isinstance(ep, dict) else getattr(ep, "text", "") or ""
     if not text:
         raise HTTPException(status_code=400, detail="Episode has no text")
-    from app.services.tts import text_to_audio
-    audio_bytes = await text_to_audio(text)
-    return Response(content=audio_bytes, media_type="audio/mpeg")
+    from app.services.audio_cache import audio_cache, audio_key
+    etag = f'"{audio_key(text)}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    found = await audio_cache.lookup(text)
+    if found is None and stream:
+        return StreamingResponse(audio_cache.stream(text), media_type="audio/mpeg", headers=headers)
+    path, _ = found or await audio_cache.get(text)
+    return FileResponse(path, media_type="audio/mpeg", headers=headers)
 
 
-@app.post("/api/story/export-video")
+def _export_job_response(job: ExportJob) -> ExportJobResponse:
+    return ExportJobResponse(
+        jobId=job.id,
+        storyId=job.story_id,
+        status=job.status,
+        progress=job.progress,
+        error=job.error,
+        downloadUrl=f"/api/story/export-video/{job.id}/download" if job.status == "done" else None,
+    )
+
+
+@app.post("/api/story/export-video", response_model=ExportJobResponse, status_code=202)
 async def export_video(body: ExportVideoRequest):
-    """Generate MP4 from story: Edge TTS per episode + images, concatenate with moviepy."""
+    """Start an MP4 export job (Edge TTS per episode + images, encoded in a worker process).
+    Poll GET /api/story/export-video/{jobId}, then download the file."""
     story = await asyncio.to_thread(repo.get_story, body.storyId)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
-    try:
-        from app.services.video_export import export_story_to_mp4
-        mp4_bytes = await export_story_to_mp4(story)
-    except Exception as e:
-        import traceback
-        print(f"[StoryTale] export-video error: {e}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail="Export failed")
-    return Response(content=mp4_bytes, media_type="video/mp4")
+    return _export_job_response(export_jobs.submit(story))
+
+
+@app.get("/api/story/export-video/{job_id}", response_model=ExportJobResponse)
+def get_export_job(job_id: str):
+    """Export job status and progress."""
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return _export_job_response(job)
+
+
+@app.get("/api/story/export-video/{job_id}/download")
+def download_export(job_id: str):
+    """Finished MP4 as a file (Range requests supported)."""
+    job = export_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job.status != "done" or job.path is None:
+        raise HTTPException(status_code=409, detail="Export not ready")
+    if not job.path.is_file():
+        raise HTTPException(status_code=410, detail="Export expired; start a new export")
+    filename = f"{job.title or 'story'}.mp4"
+    return FileResponse(job.path, media_type="video/mp4", filename=filename)
 
 
 @app.get("/{full_path:path}", include_in_schema=False)
-def serve_spa(full_path: str):
-    """Serve ไฟล์ static หรือ index.html สำหรับ SPA (รวม deploy ที่เดียว)."""
+def serve_spa(full_path: str, request: Request):
+    """Serve ไฟล์ static หรือ index.html สำหรับ SPA (รวม deploy ที่เดียว) – from the startup index (see app.static_files)."""
     if full_path.startswith("api/"):
         raise HTTPException(status_code=404, detail="Not found")
-    if not STATIC_DIR.is_dir():
-        raise HTTPException(status_code=404, detail="Not found")
-    file_path = (STATIC_DIR / full_path).resolve()
-    try:
-        if not file_path.is_relative_to(STATIC_DIR.resolve()):
-            raise HTTPException(status_code=404, detail="Not found")
-    except ValueError:
+    asset = static_index.get(full_path)
+    if asset is None and not full_path.startswith("assets/"):
+        asset = static_index.get("index.html")  # client-side route; a missing bundle stays a 404
+    if asset is None:
         raise HTTPException(status_code=404, detail="Not found")
-    if file_path.is_file():
-        return FileResponse(file_path)
-    index_html = STATIC_DIR / "index.html"
-    if index_html.is_file():
-        return FileResponse(index_html, media_type="text/html")
-    raise HTTPException(status_code=404, detail="Not found")
+    return static_index.response(asset, request)
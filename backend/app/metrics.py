@@ -0,0 +1,191 @@
+"""Minimal in-process Prometheus metrics (text exposition format 0.0.4), no client library needed.
+
+Observations are a dict lookup + a few additions under a lock, cheap enough to leave on everywhere.
+Served by GET /metrics (see app.main). Names:
+  storytale_stage_duration_seconds{stage}    chat, image:<model>, db_read, db_write, tts, video_encode, ...
+  storytale_upstream_requests_total{endpoint,outcome}   per HTTP attempt: 2xx/4xx/429/5xx/error
+  storytale_upstream_events_total{endpoint,event}       retries, hedges, breaker and throttle decisions
+  storytale_cache_requests_total{cache,result}          audio / video / video_segment / image_variant / story hit|miss
+  storytale_cache_evictions_total{cache}                in-memory story cache evictions
+plus gauges registered by app.main (in-flight generations, exports, scheduler pools).
+"""
+import functools
+import math
+import threading
+import time
+from collections.abc import Callable, Iterable
+from contextlib import contextmanager
+from typing import Optional
+
+# Seconds: covers SQLite reads (ms) up to long video encodes (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+
+_registry: dict[str, "_Metric"] = {}  # by name; re-registering (module reload) replaces
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Set directly, or give fn() returning {label values tuple: value} (or a number without labels),
+    evaluated at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), fn: Optional[Callable] = None):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+        self.fn = fn
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> list[str]:
+        if self.fn is not None:
+            try:
+                current = self.fn()
+            except Exception as e:
+                print(f"[StoryTale] metrics gauge {self.name} failed: {e}")
+                return []
+            items = sorted(current.items()) if isinstance(current, dict) else [((), current)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+                    break
+            else:
+                row[len(self.buckets)] += 1
+            row[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str):
+        """Observe the duration of the with-block (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._values.items())
+        out = []
+        for key, row in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), row):
+                cumulative += n
+                le = 'le="%s"' % _num(bound)
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {_num(cumulative)}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_num(row[-1])}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, key)} {_num(cumulative)}")
+        return out
+
+
+def render() -> str:
+    """All registered metrics in Prometheus text format."""
+    return "\n".join(m.render() for m in _registry.values()) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "storytale_stage_duration_seconds", "Time spent per pipeline stage", ["stage"]
+)
+UPSTREAM_QUEUE_SECONDS = Histogram(
+    "storytale_upstream_queue_seconds", "Time waiting for an upstream scheduler slot", ["pool"]
+)
+UPSTREAM_REQUESTS = Counter(
+    "storytale_upstream_requests_total", "Pollinations HTTP attempts by outcome", ["endpoint", "outcome"]
+)
+UPSTREAM_EVENTS = Counter(
+    "storytale_upstream_events_total", "Retry/hedge/circuit breaker/throttle decisions", ["endpoint", "event"]
+)
+CACHE_REQUESTS = Counter(
+    "storytale_cache_requests_total", "Cache lookups by result", ["cache", "result"]
+)
+CACHE_EVICTIONS = Counter(
+    "storytale_cache_evictions_total", "Entries dropped from memory/disk caches to stay under their size limit", ["cache"]
+)
+
+
+def timed(stage: str):
+    """Decorator: observe the wrapped (sync) function's duration under STAGE_SECONDS{stage}."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with STAGE_SECONDS.time(stage=stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
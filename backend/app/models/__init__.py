@@ -5,6 +5,10 @@ from .schemas import (
     StoryListItem,
     GetStoryResponse,
     ExportVideoRequest,
+    ExportJobResponse,
+    BatchGenerateRequest,
+    BatchItemResponse,
+    BatchJobResponse,
 )
 
 __all__ = [
@@ -14,4 +18,8 @@ __all__ = [
     "StoryListItem",
     "GetStoryResponse",
     "ExportVideoRequest",
+    "ExportJobResponse",
+    "BatchGenerateRequest",
+    "BatchItemResponse",
+    "BatchJobResponse",
 ]
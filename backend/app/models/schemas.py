@@ -13,6 +13,10 @@ class GenerateStoryRequest(BaseModel):
     story_lang: STORY_LANG_CHOICES = Field(default="en", description="ภาษาของเรื่อง: en (English) หรือ th (ไทย)")
     image_model: IMAGE_MODEL_CHOICES = Field(default="flux", description="โมเดลภาพ: flux หรือ zimage")
     image_style: str | None = Field(default=None, max_length=100, description="สไตล์ภาพ (ไม่บังคับ)")
+    seed: int | None = Field(
+        default=None, ge=0, le=2_147_483_647,
+        description="ตั้ง seed เพื่อให้ได้เรื่องเดิมซ้ำได้ และใช้ cache ของข้อความ (ไม่บังคับ)",
+    )
 
 
 class EpisodeOut(BaseModel):
@@ -33,6 +37,7 @@ class StoryListItem(BaseModel):
     num_episodes: int
     created_at: str
     first_episode_image_url: str | None = None
+    thumbnail_url: str | None = None
 
 
 class GetStoryResponse(BaseModel):
@@ -46,3 +51,39 @@ class GetStoryResponse(BaseModel):
 
 class ExportVideoRequest(BaseModel):
     storyId: str
+
+
+class ExportJobResponse(BaseModel):
+    jobId: str
+    storyId: str
+    status: Literal["queued", "running", "done", "failed"]
+    progress: float = Field(default=0.0, description="0.0 – 1.0")
+    error: str | None = None
+    downloadUrl: str | None = None
+
+
+class BatchGenerateRequest(BaseModel):
+    items: list[GenerateStoryRequest] = Field(..., min_length=1, max_length=500, description="เรื่องที่จะสร้าง (1-500)")
+
+
+BatchItemStatus = Literal["queued", "running", "saving", "done", "failed"]
+
+
+class BatchItemResponse(BaseModel):
+    index: int
+    topic: str
+    story_lang: STORY_LANG_CHOICES
+    status: BatchItemStatus
+    progress: float = Field(default=0.0, description="0.0 – 1.0")
+    storyId: str | None = None
+    title: str | None = None
+    error: str | None = None
+
+
+class BatchJobResponse(BaseModel):
+    batchId: str
+    status: Literal["queued", "running", "done"]
+    total: int
+    counts: dict[BatchItemStatus, int]
+    progress: float = Field(default=0.0, description="0.0 – 1.0")
+    itemsUrl: str
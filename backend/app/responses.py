@@ -0,0 +1,34 @@
+"""Fast JSON responses for endpoints whose data is already trusted (built by the repository/services).
+
+Returning FastJSONResponse from an endpoint skips FastAPI's response_model pass (re-validating the
+data with Pydantic, then jsonable_encoder); response_model stays on the route for the OpenAPI docs.
+Serialized with orjson (falls back to the stdlib json module if it is not installed).
+"""
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """UTF-8 JSON bytes (non-ASCII kept as is, Pydantic models dumped as dicts)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,144 @@
+"""Admission control for story generation: bounded concurrency (global + per client) with a bounded,
+timed wait queue. Excess load is rejected fast with a Retry-After hint instead of piling up
+coroutines (each holding episode images in memory) until the process runs out of memory.
+
+    ticket = await admission.acquire(client_id)   # may raise AdmissionRejected
+    try:
+        ...
+    finally:
+        ticket.release()
+"""
+import asyncio
+import math
+import time
+from collections import deque
+
+from fastapi import Request
+
+from app.config import (
+    GEN_MAX_ACTIVE,
+    GEN_MAX_PER_CLIENT,
+    GEN_MAX_QUEUE,
+    GEN_QUEUE_TIMEOUT,
+    TRUST_FORWARDED_FOR,
+)
+
+
+class AdmissionRejected(Exception):
+    """Request not admitted: status_code 429 (client over its limit) or 503 (server busy)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def client_key(request: Request) -> str:
+    """Client identity for per-client limits: peer address (or first X-Forwarded-For hop if trusted)."""
+    if TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for", "")
+        if forwarded.strip():
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class Ticket:
+    """An admitted request; release() is idempotent so it can be called from several cleanup paths."""
+
+    def __init__(self, controller: "AdmissionController", client: str):
+        self._controller = controller
+        self._client = client
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(self._client, time.monotonic() - self._started)
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_active: int = GEN_MAX_ACTIVE,
+        max_per_client: int = GEN_MAX_PER_CLIENT,
+        max_queue: int = GEN_MAX_QUEUE,
+        queue_timeout: float = GEN_QUEUE_TIMEOUT,
+    ):
+        self.max_active = max(1, max_active)
+        self.max_per_client = max(1, max_per_client)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.rejected = 0
+        self._queue: deque[asyncio.Future] = deque()
+        self._per_client: dict[str, int] = {}  # active + queued per client
+        self._avg_seconds = 30.0  # EWMA of generation time, for Retry-After
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for fut in self._queue if not fut.done())
+
+    def _retry_after(self) -> int:
+        waves = (self.queued + 1) / self.max_active
+        return max(1, math.ceil(waves * self._avg_seconds))
+
+    def _reject(self, status_code: int, detail: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(status_code, detail, self._retry_after())
+
+    def _leave(self, client: str) -> None:
+        n = self._per_client.get(client, 0) - 1
+        if n > 0:
+            self._per_client[client] = n
+        else:
+            self._per_client.pop(client, None)
+
+    async def acquire(self, client: str) -> Ticket:
+        """Admit now, or wait in the queue up to queue_timeout; raises AdmissionRejected otherwise."""
+        if self._per_client.get(client, 0) >= self.max_per_client:
+            raise self._reject(429, "Too many story generations in progress for this client")
+        if self.active < self.max_active and not self.queued:
+            self.active += 1
+            self._per_client[client] = self._per_client.get(client, 0) + 1
+            return Ticket(self, client)
+        if self.queued >= self.max_queue:
+            raise self._reject(503, "Server busy, try again later")
+
+        self._per_client[client] = self._per_client.get(client, 0) + 1
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.append(fut)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                # Slot was handed over just as we gave up: take it and pass it on
+                Ticket(self, client).release()
+            else:
+                fut.cancel()
+                self._leave(client)
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._reject(503, "Server busy, try again later") from None
+            raise
+        return Ticket(self, client)
+
+    def _release(self, client: str, seconds: float) -> None:
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+        self._leave(client)
+        while self._queue:
+            fut = self._queue.popleft()
+            if not fut.done():
+                fut.set_result(None)  # hand the slot over; active count unchanged
+                return
+        self.active -= 1
+
+    def stats(self) -> dict[str, int]:
+        """active / queued / rejected (since start) / limits – for health checks and autoscaling."""
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "max_active": self.max_active,
+            "max_queue": self.max_queue,
+        }
@@ -0,0 +1,123 @@
+"""Disk cache for TTS audio: key = sha256(voice, text), LRU eviction by total size, single-flight misses."""
+import asyncio
+import hashlib
+import time
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Optional
+
+from app.config import AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_MB
+from app.db import get_db_path
+from app.metrics import CACHE_REQUESTS, STAGE_SECONDS
+from app.services.disk_cache import DiskLRU
+from app.services.tts import DEFAULT_VOICE, stream_audio
+
+
+def audio_key(text: str, voice: str = DEFAULT_VOICE) -> str:
+    return hashlib.sha256(f"{voice}\0{text}".encode("utf-8")).hexdigest()
+
+
+class _Synthesis:
+    """One in-flight TTS run: chunks so far (late joiners replay them) and a wake-up for readers."""
+
+    def __init__(self):
+        self.chunks: list[bytes] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def read(self) -> AsyncIterator[bytes]:
+        sent = 0
+        while True:
+            if sent < len(self.chunks):
+                sent += 1
+                yield self.chunks[sent - 1]
+                continue
+            if self.finished:
+                if self.error is not None:
+                    raise RuntimeError("TTS synthesis failed") from self.error
+                return
+            await self._changed.wait()
+
+
+class AudioCache:
+    """Cached MP3 files under dir_path/<key>.mp3 (see DiskLRU)."""
+
+    def __init__(self, dir_path: Optional[Path] = None, max_bytes: int = AUDIO_CACHE_MAX_MB * 1024 * 1024):
+        self.store = DiskLRU(
+            Path(dir_path or AUDIO_CACHE_DIR or get_db_path().parent / "audio_cache"), max_bytes, ".mp3", name="audio"
+        )
+        self._inflight: dict[str, _Synthesis] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def lookup(self, text: str, voice: str = DEFAULT_VOICE) -> Optional[tuple[Path, str]]:
+        """Return (path, key) if cached, else None (an in-flight synthesis is joined with stream()/get())."""
+        key = audio_key(text, voice)
+        path = self.store.lookup(key)
+        if path is not None:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="audio", result="hit")
+            return path, key
+        return None
+
+    async def get(self, text: str, voice: str = DEFAULT_VOICE) -> tuple[Path, str]:
+        """Return (path to MP3, key); synthesize once on miss, concurrent misses share one TTS call."""
+        found = await self.lookup(text, voice)
+        if found:
+            return found
+        synthesis = self._synthesis(text, voice)
+        await asyncio.shield(synthesis.task)  # a caller going away must not cancel the shared run
+        if synthesis.error is not None:
+            raise RuntimeError("TTS synthesis failed") from synthesis.error
+        key = audio_key(text, voice)
+        return self.store.path(key), key
+
+    def stream(self, text: str, voice: str = DEFAULT_VOICE) -> AsyncIterator[bytes]:
+        """Cache miss: MP3 chunks as Edge TTS produces them. Not a coroutine on purpose: the synthesis is
+        started (or joined, if one for the same key is running) before this returns, so concurrent
+        misses share one TTS call and each reader gets the full audio."""
+        return self._synthesis(text, voice).read()
+
+    def _synthesis(self, text: str, voice: str) -> _Synthesis:
+        key = audio_key(text, voice)
+        synthesis = self._inflight.get(key)
+        if synthesis is None:
+            synthesis = self._inflight[key] = _Synthesis()
+            synthesis.task = asyncio.create_task(self._synthesize(key, text, voice, synthesis))
+        return synthesis
+
+    async def _synthesize(self, key: str, text: str, voice: str, synthesis: _Synthesis) -> None:
+        """Run TTS into a temp file, publishing chunks to readers; commit to the cache when complete.
+        Runs to the end even if every reader disconnects (the next request is then a cache hit)."""
+        self.misses += 1
+        CACHE_REQUESTS.inc(cache="audio", result="miss")
+        start = time.perf_counter()
+        tmp = self.store.temp_path(key)
+        try:
+            with open(tmp, "wb") as f:
+                async for chunk in stream_audio(text, voice):
+                    f.write(chunk)
+                    synthesis.chunks.append(chunk)
+                    synthesis.publish()
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage="tts")
+            await asyncio.to_thread(self.store.commit, tmp, key)
+        except Exception as e:
+            print(f"[StoryTale] TTS synthesis failed: {e}")
+            synthesis.error = e
+        except BaseException as e:  # cancelled (shutdown)
+            synthesis.error = e
+            raise
+        finally:
+            tmp.unlink(missing_ok=True)
+            self._inflight.pop(key, None)
+            synthesis.finished = True
+            synthesis.publish()
+
+
+audio_cache = AudioCache()
@@ -0,0 +1,263 @@
+"""Batch story generation: many GenerateStoryRequest items run by a shared worker pool, saved in bulk.
+
+Workers (BATCH_WORKERS, all batches share one FIFO queue) start at most BATCH_RATE_PER_MIN stories per
+minute and call Pollinations at "background" priority, so interactive /api/story/generate traffic goes
+first in the upstream scheduler. Finished stories are written by one flusher with repo.save_stories:
+a transaction per BATCH_FLUSH_SIZE stories, or whatever is pending every BATCH_FLUSH_SECONDS.
+"""
+import asyncio
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from typing import Literal, Optional
+
+from app.config import (
+    BATCH_WORKERS,
+    BATCH_RATE_PER_MIN,
+    BATCH_MAX_PENDING,
+    BATCH_FLUSH_SIZE,
+    BATCH_FLUSH_SECONDS,
+    BATCH_TTL_SECONDS,
+)
+from app.db import StoryRepository
+from app.models import GenerateStoryRequest
+from app.services.scheduler import upstream_priority
+from app.services.story_service import StoryService
+
+ItemStatus = Literal["queued", "running", "saving", "done", "failed"]
+ITEM_STATUSES: tuple[ItemStatus, ...] = ("queued", "running", "saving", "done", "failed")
+
+
+class BatchFull(Exception):
+    """Too many items waiting across all batches (BATCH_MAX_PENDING)."""
+
+
+@dataclass
+class BatchItem:
+    index: int
+    request: GenerateStoryRequest
+    status: ItemStatus = "queued"
+    story_id: Optional[str] = None
+    title: Optional[str] = None
+    error: Optional[str] = None
+    episodes_done: int = 0
+    num_episodes: int = 0
+    finished_at: Optional[float] = None
+
+    @property
+    def progress(self) -> float:
+        if self.status in ("saving", "done", "failed"):
+            return 1.0
+        if self.status == "running" and self.num_episodes:
+            return round(0.1 + 0.9 * self.episodes_done / self.num_episodes, 3)  # 0.1 = story text
+        return 0.0
+
+
+@dataclass
+class BatchJob:
+    id: str
+    items: list[BatchItem]
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    remaining: int = 0  # items not yet done/failed
+
+    @property
+    def status(self) -> Literal["queued", "running", "done"]:
+        if self.remaining == 0:
+            return "done"
+        if all(item.status == "queued" for item in self.items):
+            return "queued"
+        return "running"
+
+    def counts(self) -> dict[str, int]:
+        counts = {status: 0 for status in ITEM_STATUSES}
+        for item in self.items:
+            counts[item.status] += 1
+        return counts
+
+    @property
+    def progress(self) -> float:
+        return round(sum(item.progress for item in self.items) / len(self.items), 3) if self.items else 1.0
+
+
+class BatchManager:
+    """In-process batch registry (single uvicorn worker). Batch records expire ttl seconds after their
+    last item finishes; items still queued at shutdown are dropped (stories already generated are saved)."""
+
+    def __init__(
+        self,
+        story_service: StoryService,
+        repo: Optional[StoryRepository] = None,
+        workers: int = BATCH_WORKERS,
+        rate_per_min: float = BATCH_RATE_PER_MIN,
+        max_pending: int = BATCH_MAX_PENDING,
+        flush_size: int = BATCH_FLUSH_SIZE,
+        flush_seconds: float = BATCH_FLUSH_SECONDS,
+        ttl: int = BATCH_TTL_SECONDS,
+    ):
+        self.story_service = story_service
+        self.repo = repo or story_service.repo
+        self.workers = workers
+        self.rate_per_min = rate_per_min
+        self.max_pending = max_pending
+        self.flush_size = flush_size
+        self.flush_seconds = flush_seconds
+        self.ttl = ttl
+        self._jobs: dict[str, BatchJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._next_start = 0.0
+        self._pace_lock: Optional[asyncio.Lock] = None
+        self._pending: list[tuple[BatchJob, BatchItem, dict]] = []  # generated, waiting for the bulk write
+        self._flush_now: Optional[asyncio.Event] = None
+
+    def _start(self) -> None:
+        """Create the queue and worker/flusher tasks on first use (needs the running loop)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        self._pace_lock = asyncio.Lock()
+        self._flush_now = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._flusher()))
+
+    async def shutdown(self) -> None:
+        """Stop workers and write stories that are generated but not yet saved; await from lifespan shutdown.
+        A bulk write already in progress completes and its items get their final status."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._pending:
+            await self._flush()
+
+    def stats(self) -> dict[str, int]:
+        """Number of items per status across known batches."""
+        counts = {status: 0 for status in ITEM_STATUSES}
+        for job in self._jobs.values():
+            for status, n in job.counts().items():
+                counts[status] += n
+        return counts
+
+    def get(self, batch_id: str) -> Optional[BatchJob]:
+        return self._jobs.get(batch_id)
+
+    def submit(self, requests: list[GenerateStoryRequest]) -> BatchJob:
+        """Register a batch and queue its items; raises BatchFull if the shared queue can't take them."""
+        self._prune()
+        self._start()
+        if self._queue.qsize() + len(requests) > self.max_pending:
+            raise BatchFull(f"{self._queue.qsize()} items already queued (limit {self.max_pending})")
+        job = BatchJob(id=uuid.uuid4().hex, items=[BatchItem(i, r) for i, r in enumerate(requests)])
+        job.remaining = len(job.items)
+        self._jobs[job.id] = job
+        for item in job.items:
+            self._queue.put_nowait((job, item))
+        print(f"[StoryTale] Batch {job.id}: {len(job.items)} stories queued")
+        return job
+
+    async def _pace(self) -> None:
+        """Space story starts 60/rate_per_min seconds apart (all workers together)."""
+        if self.rate_per_min <= 0:
+            return
+        async with self._pace_lock:
+            now = time.monotonic()
+            if self._next_start > now:
+                await asyncio.sleep(self._next_start - now)
+            self._next_start = max(now, self._next_start) + 60 / self.rate_per_min
+
+    async def _worker(self) -> None:
+        while True:
+            job, item = await self._queue.get()
+            try:
+                await self._pace()
+                await self._run(job, item)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: BatchJob, item: BatchItem) -> None:
+        body = item.request
+        item.status = "running"
+        item.num_episodes = body.num_episodes
+        record = None
+        try:
+            with upstream_priority("background"):
+                async for event in self.story_service.generate_events(
+                    body.topic, body.num_episodes, body.story_lang, body.image_model, body.image_style,
+                    seed=body.seed, save=False,
+                ):
+                    if event["event"] == "story":
+                        item.title = event["title"]  # storyId is published once the story is saved
+                        item.num_episodes = event["num_episodes"]
+                    elif event["event"] == "episode":
+                        item.episodes_done += 1
+                    elif event["event"] == "ready":
+                        record = event["story"]
+        except asyncio.CancelledError:
+            self._finish(job, item, "failed", "Interrupted by server shutdown")
+            raise
+        except Exception as e:
+            print(f"[StoryTale] Batch {job.id} item {item.index} error: {e}")
+            traceback.print_exc()
+            record = None
+        if record is None:
+            self._finish(job, item, "failed", "Story generation failed")
+            return
+        item.status = "saving"
+        self._pending.append((job, item, record))
+        if len(self._pending) >= self.flush_size or self._queue.empty():
+            self._flush_now.set()
+
+    async def _flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), timeout=self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            if self._pending:
+                await self._flush()
+
+    async def _flush(self) -> None:
+        """Write everything pending in one transaction, then record each item's outcome. The write is
+        shielded: if the caller is cancelled (shutdown) the transaction still finishes and is recorded."""
+        pending, self._pending = self._pending, []
+        write = asyncio.ensure_future(asyncio.to_thread(self._write, [record for _, _, record in pending]))
+        try:
+            await asyncio.shield(write)
+        finally:
+            error = await write  # already done unless we were cancelled: then wait for the transaction
+            for job, item, record in pending:
+                self._finish(job, item, "failed" if error else "done", error, story_id=record["story_id"])
+
+    def _write(self, records: list[dict]) -> Optional[str]:
+        """One transaction for all records; returns an error message if it failed (nothing was saved)."""
+        try:
+            self.repo.save_stories(records)
+        except Exception as e:
+            print(f"[StoryTale] Batch write of {len(records)} stories failed: {e}")
+            return "Save failed"
+        print(f"[StoryTale] Batch write: {len(records)} stories saved")
+        return None
+
+    def _finish(
+        self, job: BatchJob, item: BatchItem, status: ItemStatus, error: Optional[str], story_id: Optional[str] = None
+    ) -> None:
+        item.status = status
+        item.error = error
+        if status == "done":
+            item.story_id = story_id  # only now can GET /api/story/{id} find it
+        item.finished_at = time.time()
+        job.remaining -= 1
+        if job.remaining == 0:
+            job.finished_at = item.finished_at
+            counts = job.counts()
+            print(f"[StoryTale] Batch {job.id} finished: {counts['done']} done, {counts['failed']} failed")
+
+    def _prune(self) -> None:
+        """Drop finished batch records older than ttl."""
+        cutoff = time.time() - self.ttl
+        for batch_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[batch_id]
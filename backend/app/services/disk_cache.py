@@ -0,0 +1,84 @@
+"""Size-bounded file cache on disk: one file per key, LRU eviction (file mtime is the clock)."""
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.metrics import CACHE_EVICTIONS
+
+
+class DiskLRU:
+    """Files under dir_path/<key><suffix>. Writers fill temp_path() then commit(); readers lookup().
+    Sync (filesystem only) – cheap enough to call from the event loop for lookups; commit via to_thread."""
+
+    def __init__(self, dir_path: Path, max_bytes: int, suffix: str = "", name: str = "disk"):
+        self.dir = Path(dir_path)
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.name = name  # metrics label
+        self._total: Optional[int] = None  # bytes on disk; scanned lazily
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> Path:
+        return self.dir / f"{key}{self.suffix}"
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Path of the cached file (marked as recently used), or None."""
+        path = self.path(key)
+        if not path.is_file():
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def temp_path(self, key: str) -> Path:
+        """Unique temp file (keeps the suffix, e.g. for ffmpeg) under dir/tmp – same filesystem,
+        so commit is an atomic rename, and outside the entries that are counted/evicted."""
+        tmp_dir = self.dir / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        return tmp_dir / f"{key}.{uuid.uuid4().hex}{self.suffix}"
+
+    def commit(self, tmp: Path, key: str) -> Path:
+        """Move a filled temp file into the cache (replacing any entry for key); evict least recently
+        used entries (never this one)."""
+        path = self.path(key)
+        with self._lock:
+            try:
+                replaced = path.stat().st_size  # re-commit of a key: its old size leaves the total
+            except OSError:
+                replaced = 0
+            os.replace(tmp, path)  # atomic: readers never see a partial file
+            self._account(path, replaced)
+        return path
+
+    def _account(self, new_path: Path, replaced: int) -> None:
+        """Update the byte total and evict; caller holds the lock."""
+        added = new_path.stat().st_size
+        if self._total is None:
+            self._total = sum(p.stat().st_size for p in self._entries())
+        else:
+            self._total += added - replaced
+        if self._total <= self.max_bytes:
+            return
+        files = sorted(self._entries(), key=lambda p: p.stat().st_mtime)
+        evicted = 0
+        for p in files:
+            if self._total <= self.max_bytes:
+                break
+            if p == new_path:
+                continue
+            try:
+                size = p.stat().st_size
+                p.unlink()
+                self._total -= size
+                evicted += 1
+            except OSError:
+                pass
+        if evicted:
+            CACHE_EVICTIONS.inc(evicted, cache=self.name)
+
+    def _entries(self) -> list[Path]:
+        return [p for p in self.dir.glob(f"*{self.suffix}") if p.is_file()]
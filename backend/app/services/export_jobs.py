@@ -0,0 +1,118 @@
+"""Background video export jobs: TTS/images on the event loop, encoding in a bounded process pool."""
+import asyncio
+import functools
+import multiprocessing
+import shutil
+import tempfile
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Literal, Optional
+
+from app.config import VIDEO_EXPORT_DIR, VIDEO_EXPORT_TTL_SECONDS, VIDEO_EXPORT_WORKERS
+from app.db import StoryRepository, get_db_path
+from app.services.video_export import build_story_video
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+
+
+@dataclass
+class ExportJob:
+    id: str
+    story_id: str
+    title: str
+    status: JobStatus = "queued"
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    progress: float = 0.0
+    path: Optional[Path] = None  # entry in video_cache once done
+
+
+class ExportJobManager:
+    """In-process job registry (single uvicorn worker). Job records expire ttl seconds after finishing;
+    the MP4 files themselves live in the video cache and are evicted by its size limit."""
+
+    def __init__(
+        self,
+        repo: Optional[StoryRepository] = None,
+        out_dir: Optional[Path] = None,
+        workers: int = VIDEO_EXPORT_WORKERS,
+        ttl: int = VIDEO_EXPORT_TTL_SECONDS,
+    ):
+        self.repo = repo or StoryRepository()
+        self.out_dir = Path(out_dir or VIDEO_EXPORT_DIR or get_db_path().parent / "exports")
+        self.workers = workers
+        self.ttl = ttl
+        self._jobs: dict[str, ExportJob] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: don't fork the event loop / sqlite connections into encoder processes
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Stop encoder processes; call from lifespan shutdown."""
+        for task in self._tasks:
+            task.cancel()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict[str, int]:
+        """Number of known jobs per status."""
+        counts = {status: 0 for status in ("queued", "running", "done", "failed")}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        return self._jobs.get(job_id)
+
+    def submit(self, story: dict) -> ExportJob:
+        """Register a job for a loaded story and start it in the background."""
+        self._prune()
+        job = ExportJob(id=uuid.uuid4().hex, story_id=story["storyId"], title=story.get("title", ""))
+        self._jobs[job.id] = job
+        task = asyncio.create_task(self._run(job, story))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: ExportJob, story: dict) -> None:
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        work = Path(tempfile.mkdtemp(prefix=f"job-{job.id}-", dir=self.out_dir))
+        job.status = "running"
+
+        def on_progress(fraction: float) -> None:
+            job.progress = round(max(job.progress, fraction), 3)
+
+        try:
+            run_cpu = functools.partial(asyncio.get_running_loop().run_in_executor, self._executor())
+            job.path = await build_story_video(story, work, run_cpu, self.repo, on_progress=on_progress)
+            job.progress = 1.0
+            job.status = "done"
+            print(f"[StoryTale] Export job {job.id} done ({job.path.stat().st_size} bytes)")
+        except Exception as e:
+            print(f"[StoryTale] export-video job {job.id} error: {e}")
+            traceback.print_exc()
+            job.status = "failed"
+            job.error = "Export failed"
+        finally:
+            job.finished_at = time.time()
+            shutil.rmtree(work, ignore_errors=True)
+
+    def _prune(self) -> None:
+        """Drop finished job records older than ttl."""
+        cutoff = time.time() - self.ttl
+        for job_id, job in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < cutoff:
+                del self._jobs[job_id]
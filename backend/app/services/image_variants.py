@@ -0,0 +1,177 @@
+"""Image variants: stored originals resized to a few standard widths and re-encoded as AVIF/WebP/JPEG.
+
+Made lazily on first request (GET /api/image/{hash}?w=512&format=webp, or format picked from Accept),
+in a bounded thread pool (Pillow releases the GIL while resizing/encoding) so the event loop never
+blocks, then kept in a size-bounded disk cache. Concurrent requests for the same variant share one encode.
+"""
+import asyncio
+import io
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from app.config import (
+    IMAGE_VARIANT_WIDTHS,
+    IMAGE_VARIANT_CACHE_DIR,
+    IMAGE_VARIANT_CACHE_MAX_MB,
+    IMAGE_VARIANT_WORKERS,
+)
+from app.db import get_db_path
+from app.metrics import CACHE_REQUESTS, STAGE_SECONDS
+from app.services.disk_cache import DiskLRU
+
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+# Preference when the client accepts several: smallest files first
+_PREFERENCE = ("avif", "webp")
+
+
+@lru_cache(maxsize=1)
+def supported_formats() -> frozenset[str]:
+    """Formats this Pillow build can write (AVIF needs Pillow >= 11.2 built with libavif)."""
+    from PIL import Image
+
+    Image.init()
+    return frozenset(fmt for fmt in MEDIA_TYPES if fmt.upper() in Image.SAVE)
+
+
+def snap_width(requested: Optional[int]) -> Optional[int]:
+    """Smallest standard width >= requested; None = original size (no hint, or wider than all standards)."""
+    if not requested or requested <= 0:
+        return None
+    for width in IMAGE_VARIANT_WIDTHS:
+        if width >= requested:
+            return width
+    return None
+
+
+def _accepted_types(accept: str) -> set[str]:
+    types = set()
+    for part in accept.split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    pass
+        if media and q > 0:
+            types.add(media.lower())
+    return types
+
+
+def negotiate_format(accept: str, hint: Optional[str] = None) -> Optional[str]:
+    """Output format: an explicit supported hint wins, else the best of AVIF/WebP the client accepts;
+    None = keep the original encoding."""
+    hint = (hint or "").lower().replace("jpg", "jpeg")
+    if hint in supported_formats():
+        return hint
+    accepted = _accepted_types(accept or "")
+    for fmt in _PREFERENCE:
+        if fmt in supported_formats() and MEDIA_TYPES[fmt] in accepted:
+            return fmt
+    return None
+
+
+def variant_key(image_hash: str, width: Optional[int], fmt: str) -> str:
+    return f"{image_hash}_{width or 0}_{fmt}"
+
+
+def encode_variant(data: bytes, width: Optional[int], fmt: str) -> bytes:
+    """Resize (longest side = width, never upscale) and encode. Sync, CPU-bound – run in the pool."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        if width:
+            img.draft("RGB", (width, width))  # JPEG: decode at reduced scale
+        img = img.convert("RGB")
+        if width:
+            img.thumbnail((width, width), Image.Resampling.LANCZOS)
+        out = io.BytesIO()
+        if fmt == "avif":
+            img.save(out, format="AVIF", quality=55, speed=8)
+        elif fmt == "webp":
+            img.save(out, format="WEBP", quality=80, method=4)
+        else:
+            img.save(out, format="JPEG", quality=82, optimize=True, progressive=True)
+        return out.getvalue()
+
+
+class ImageVariants:
+    """Variant files under dir_path/<hash>_<width>_<format>.img (see DiskLRU)."""
+
+    def __init__(
+        self,
+        dir_path: Optional[Path] = None,
+        max_bytes: int = IMAGE_VARIANT_CACHE_MAX_MB * 1024 * 1024,
+        workers: int = IMAGE_VARIANT_WORKERS,
+    ):
+        self.store = DiskLRU(
+            Path(dir_path or IMAGE_VARIANT_CACHE_DIR or get_db_path().parent / "image_cache"),
+            max_bytes, ".img", name="image_variant",
+        )
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="image-variant")
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Stop the encoder threads; call from lifespan shutdown."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _build(self, data: bytes, width: Optional[int], fmt: str, key: str) -> Optional[Path]:
+        """Encode + write + commit (runs in the pool); None if the image cannot be decoded."""
+        try:
+            with STAGE_SECONDS.time(stage="image_variant"):
+                encoded = encode_variant(data, width, fmt)
+        except Exception as e:
+            print(f"[StoryTale] Image variant {key} failed: {e}")
+            return None
+        tmp = self.store.temp_path(key)
+        try:
+            tmp.write_bytes(encoded)
+            return self.store.commit(tmp, key)
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    async def get(
+        self,
+        image_hash: str,
+        width: Optional[int],
+        fmt: str,
+        load: Callable[[], Awaitable[Optional[bytes]]],
+    ) -> Optional[Path]:
+        """Path of the cached variant, encoding it from load() (original bytes) on a miss.
+        None if the original is missing or cannot be decoded (caller serves the original)."""
+        key = variant_key(image_hash, width, fmt)
+        path = self.store.lookup(key)
+        if path is not None:
+            CACHE_REQUESTS.inc(cache="image_variant", result="hit")
+            return path
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        CACHE_REQUESTS.inc(cache="image_variant", result="miss")
+        loop = asyncio.get_running_loop()
+        done = self._inflight[key] = loop.create_future()
+        result: Optional[Path] = None
+        try:
+            data = await load()
+            if data is not None:
+                result = await loop.run_in_executor(self._executor(), self._build, data, width, fmt, key)
+            return result
+        finally:
+            self._inflight.pop(key, None)
+            done.set_result(result)
+
+
+image_variants = ImageVariants()
@@ -0,0 +1,104 @@
+"""Incremental parser for the story JSON while the LLM is still writing it.
+
+Feed text chunks; get back fields of the top-level object as soon as each value is complete
+(("title", ...), ("characterDescription", ...), ...) and every element of the "episodes" array as
+soon as its object closes (("episode", (index, {...}))). Text before the first "{" (e.g. a ```json
+fence) and after the closing "}" is ignored.
+"""
+import json
+from typing import Any
+
+
+class StoryJsonStream:
+    ARRAY_KEY = "episodes"
+
+    def __init__(self):
+        self._buf = ""
+        self._started = False
+        self.done = False
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._str_start = 0
+        self._expect_key = True  # inside the top-level object: next string is a key (vs. a value)
+        self._key: str | None = None
+        self._value_start: int | None = None
+        self._elem_start: int | None = None
+        self._elem_index = 0
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        """Consume a chunk; return the fields/episodes completed by it, in order."""
+        out: list[tuple[str, Any]] = []
+        start = len(self._buf)
+        self._buf += chunk
+        for i in range(start, len(self._buf)):
+            if self.done:
+                break
+            self._step(i, self._buf[i], out)
+        return out
+
+    def _emit_value(self, end: int, out: list) -> None:
+        raw = self._buf[self._value_start:end].strip()
+        self._value_start = None
+        if self._key is None or not raw:
+            return
+        try:
+            out.append((self._key, json.loads(raw)))
+        except ValueError:
+            pass  # malformed value: the full parse at the end will report it
+
+    def _step(self, i: int, ch: str, out: list) -> None:
+        if self._in_str:
+            if self._esc:
+                self._esc = False
+            elif ch == "\\":
+                self._esc = True
+            elif ch == '"':
+                self._in_str = False
+                if self._depth == 1:
+                    if self._expect_key:
+                        self._key = json.loads(self._buf[self._str_start:i + 1])
+                    elif self._value_start is not None:
+                        self._emit_value(i + 1, out)
+            return
+        if not self._started:
+            if ch == "{":
+                self._started = True
+                self._depth = 1
+            return
+        if ch == '"':
+            self._in_str = True
+            self._str_start = i
+            if self._depth == 1 and not self._expect_key and self._value_start is None:
+                self._value_start = i
+        elif ch in "{[":
+            if self._depth == 1 and not self._expect_key and self._value_start is None:
+                self._value_start = i
+            if self._depth == 2 and ch == "{" and self._key == self.ARRAY_KEY:
+                self._elem_start = i
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            if self._depth == 2 and ch == "}" and self._elem_start is not None:
+                try:
+                    out.append(("episode", (self._elem_index, json.loads(self._buf[self._elem_start:i + 1]))))
+                except ValueError:
+                    pass
+                self._elem_start = None
+                self._elem_index += 1
+            elif self._depth == 1 and self._value_start is not None:
+                self._emit_value(i + 1, out)
+            elif self._depth == 0:
+                if self._value_start is not None:
+                    self._emit_value(i, out)  # trailing scalar, e.g. {"n": 5}
+                self.done = True
+        elif self._depth == 1:
+            if ch == ":":
+                self._expect_key = False
+                self._value_start = None
+            elif ch == ",":
+                if self._value_start is not None:
+                    self._emit_value(i, out)
+                self._expect_key = True
+            elif not ch.isspace() and not self._expect_key and self._value_start is None:
+                self._value_start = i  # number / true / false / null
@@ -0,0 +1,70 @@
+"""Persistent cache of story chat completions (seeded requests only, see pollinations._story_request).
+
+A seeded request always produces the same payload, so its completion can be reused: the key is a hash
+of (model, messages, temperature, seed). One small JSON file per entry in a DiskLRU (size-bounded);
+entries older than the TTL count as misses and are replaced on the next write.
+"""
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from app.config import LLM_CACHE_DIR, LLM_CACHE_MAX_MB, LLM_CACHE_TTL_SECONDS
+from app.db import get_db_path
+from app.metrics import CACHE_REQUESTS
+from app.services.disk_cache import DiskLRU
+
+
+def chat_cache_key(payload: dict[str, Any]) -> str:
+    """sha256 of the fields that decide the completion (not "stream": streamed and plain calls share entries)."""
+    fields = {name: payload.get(name) for name in ("model", "messages", "temperature", "seed")}
+    return hashlib.sha256(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ChatCache:
+    """Completion text under dir_path/<key>.json as {"created_at", "content"}."""
+
+    def __init__(
+        self,
+        dir_path: Optional[Path] = None,
+        max_bytes: int = LLM_CACHE_MAX_MB * 1024 * 1024,
+        ttl: int = LLM_CACHE_TTL_SECONDS,
+    ):
+        self.store = DiskLRU(
+            Path(dir_path or LLM_CACHE_DIR or get_db_path().parent / "llm_cache"), max_bytes, ".json", name="llm"
+        )
+        self.enabled = max_bytes > 0
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached completion content, or None (missing, expired or unreadable). Sync file read – call via to_thread."""
+        if not self.enabled:
+            return None
+        path = self.store.lookup(key)
+        content = None
+        if path is not None:
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+                if not self.ttl or time.time() - entry["created_at"] < self.ttl:
+                    content = entry["content"]
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+        CACHE_REQUESTS.inc(cache="llm", result="miss" if content is None else "hit")
+        return content
+
+    def put(self, key: str, content: str) -> None:
+        """Store a completion (sync file write + eviction – call via to_thread)."""
+        if not self.enabled:
+            return
+        tmp = self.store.temp_path(key)
+        try:
+            tmp.write_text(json.dumps({"created_at": time.time(), "content": content}, ensure_ascii=False), encoding="utf-8")
+            self.store.commit(tmp, key)
+        except OSError as e:
+            print(f"[StoryTale] LLM cache write failed: {e}")
+        finally:
+            tmp.unlink(missing_ok=True)
+
+
+chat_cache = ChatCache()
@@ -1,16 +1,96 @@
 """Pollinations API client: chat completions (story JSON) + image generation."""
+import asyncio
 import json
 import random
 import urllib.parse
+from collections.abc import AsyncIterator
+from contextlib import AsyncExitStack
 from typing import Any
 
 import httpx
 
-from app.config import POLLINATIONS_API_KEY, POLLINATIONS_BASE
+from app.config import (
+    POLLINATIONS_API_KEY,
+    POLLINATIONS_BASE,
+    POLLINATIONS_HTTP2,
+    POLLINATIONS_MAX_CONNECTIONS,
+    POLLINATIONS_MAX_KEEPALIVE,
+    POLLINATIONS_KEEPALIVE_EXPIRY,
+    POLLINATIONS_CONNECT_TIMEOUT,
+    POLLINATIONS_CHAT_TIMEOUT,
+    POLLINATIONS_IMAGE_TIMEOUT,
+    POLLINATIONS_HEDGE,
+)
+from app.metrics import STAGE_SECONDS, UPSTREAM_REQUESTS
+from app.services.json_stream import StoryJsonStream
+from app.services.llm_cache import chat_cache, chat_cache_key
+from app.services.resilience import call_with_resilience
+from app.services.scheduler import scheduler
 
 CHAT_URL = f"{POLLINATIONS_BASE}/v1/chat/completions"
 IMAGE_BASE = f"{POLLINATIONS_BASE}/image"
 
+# Process-wide pooled client; opened/closed by the app lifespan (see app.main)
+_client: httpx.AsyncClient | None = None
+
+
+def _new_client() -> httpx.AsyncClient:
+    http2 = POLLINATIONS_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("[StoryTale] POLLINATIONS_HTTP2 set but `h2` not installed; using HTTP/1.1")
+            http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=POLLINATIONS_MAX_CONNECTIONS,
+            max_keepalive_connections=POLLINATIONS_MAX_KEEPALIVE,
+            keepalive_expiry=POLLINATIONS_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(POLLINATIONS_IMAGE_TIMEOUT, connect=POLLINATIONS_CONNECT_TIMEOUT),
+    )
+
+
+async def open_client() -> None:
+    """Create the shared client; call from lifespan startup."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+
+
+async def close_client() -> None:
+    """Close the shared client; call from lifespan shutdown."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared client (created lazily if lifespan did not run, e.g. scripts)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _new_client()
+    return _client
+
+
+def _paced(pool: str, send):
+    """Wrap one HTTP attempt: wait for the pool's rate token, then feed the status back to the scheduler."""
+    async def attempt() -> httpx.Response:
+        await scheduler.before_attempt(pool)
+        try:
+            r = await send()
+        except Exception:
+            UPSTREAM_REQUESTS.inc(endpoint=pool, outcome="error")
+            raise
+        scheduler.after_attempt(pool, r.status_code)
+        outcome = "429" if r.status_code == 429 else f"{r.status_code // 100}xx"
+        UPSTREAM_REQUESTS.inc(endpoint=pool, outcome=outcome)
+        return r
+    return attempt
+
 
 def _headers() -> dict:
     """Headers for chat: ไม่ส่ง Authorization เพื่อใช้ ?key= อย่างเดียว (ลดโอกาส 401)."""
@@ -29,8 +109,11 @@ def _image_params(prompt: str, width: int = 1024, height: int = 1024, model: str
     return p
 
 
-async def generate_story_json(topic: str, num_episodes: int, story_lang: str = "en") -> dict[str, Any]:
-    """Call Pollinations chat completions; return parsed JSON. story_lang: en = English, th = Thai."""
+def _story_request(
+    topic: str, num_episodes: int, story_lang: str, seed: int | None = None
+) -> tuple[str, dict[str, Any]]:
+    """(url, payload) for the story chat completion. seed: variation seed, hint and temperature are derived
+    from it (same inputs -> same payload, so the completion can be cached); None = random each call."""
     lang_rule = (
         'Write the story title and ALL episode "text" in Thai (ภาษาไทย).'
         if story_lang == "th"
@@ -52,7 +135,8 @@ Rules:
 Output ONLY valid JSON, no markdown or extra text:
 {{"title": "Story title", "characterDescription": "short visual description of main characters", "artStyle": "short description of illustration style for the whole story", "episodes": [{{"text": "...", "imagePrompt": "..."}}, ...]}}"""
 
-    seed = random.randint(1, 999_999)
+    rng = random.Random(seed) if seed is not None else random
+    variation = rng.randint(1, 999_999)
     variation_hints = [
         "Create a unique, surprising version—avoid the most obvious plot.",
         "Tell a fresh take on this theme; surprise the reader with an unexpected twist or setting.",
@@ -60,8 +144,8 @@ Output ONLY valid JSON, no markdown or extra text:
         "Use an unusual setting or situation for this topic.",
         "Make the moral or journey different from the typical story for this theme.",
     ]
-    hint = random.choice(variation_hints)
-    user = f"Write a children's story about: {topic}. Use exactly {num_episodes} episodes. [Variation seed: {seed}] {hint}"
+    hint = rng.choice(variation_hints)
+    user = f"Write a children's story about: {topic}. Use exactly {num_episodes} episodes. [Variation seed: {variation}] {hint}"
 
     payload = {
         "model": CHAT_MODEL,
@@ -69,8 +153,10 @@ Output ONLY valid JSON, no markdown or extra text:
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
-        "temperature": random.uniform(0.75, 0.92),
+        "temperature": rng.uniform(0.75, 0.92),
     }
+    if seed is not None:
+        payload["seed"] = seed  # also ask the model for a reproducible sample
     # Pollinations: ใช้ ?key= อย่างเดียว (ถ้าส่ง Bearer ด้วยบางครั้งได้ 401)
     url = CHAT_URL
     if POLLINATIONS_API_KEY:
@@ -80,11 +166,11 @@ Output ONLY valid JSON, no markdown or extra text:
         print(f"[StoryTale] Pollinations API key loaded: {key_preview}")
     else:
         print("[StoryTale] POLLINATIONS_API_KEY not set; request may be rate-limited or 401.")
-    async with httpx.AsyncClient(timeout=120.0) as client:
-        r = await client.post(url, json=payload, headers=_headers())
-        r.raise_for_status()
-        data = r.json()
-    content = data.get("choices", [{}])[0].get("message", {}).get("content", "{}")
+    return url, payload
+
+
+def _parse_story_content(content: str) -> dict[str, Any]:
+    """Full model output -> validated story dict."""
     # Strip markdown code block if present
     if content.strip().startswith("```"):
         lines = content.strip().split("\n")
@@ -100,6 +186,69 @@ Output ONLY valid JSON, no markdown or extra text:
     return parsed
 
 
+async def stream_story_json(
+    topic: str, num_episodes: int, story_lang: str = "en", seed: int | None = None
+) -> AsyncIterator[tuple[str, Any]]:
+    """Call Pollinations chat completions with stream: true. story_lang: en = English, th = Thai.
+    While the model is still writing, yields each top-level field as soon as its value is complete
+    (("title", str), ("characterDescription", str), ("artStyle", str), ...) and
+    ("episode", (index, {"text", "imagePrompt"})) per finished episode; finally ("story", parsed) with the
+    validated story dict. seed: reproducible request, answered from chat_cache when the same one was made
+    before – a cache hit yields the same events at once, without an upstream call."""
+    url, payload = _story_request(topic, num_episodes, story_lang, seed)
+    parser = StoryJsonStream()
+    cache_key = chat_cache_key(payload) if seed is not None else None
+    if cache_key:
+        cached = await asyncio.to_thread(chat_cache.get, cache_key)
+        if cached is not None:
+            for item in parser.feed(cached):
+                yield item
+            yield "story", _parse_story_content(cached)
+            return
+    payload["stream"] = True
+    timeout = httpx.Timeout(POLLINATIONS_CHAT_TIMEOUT, connect=POLLINATIONS_CONNECT_TIMEOUT)
+    parts: list[str] = []
+    client = get_client()
+    req = client.build_request("POST", url, json=payload, headers=_headers(), timeout=timeout)
+    # The successful attempt's scheduler slot is kept until the stream is fully read
+    async with AsyncExitStack() as slot_held:
+        with STAGE_SECONDS.time(stage="chat"):
+            # Retries/breaker cover the request up to the response headers; a stream that breaks later fails the story
+            r = await call_with_resilience(
+                "chat", _paced("chat", lambda: client.send(req, stream=True)),
+                slot=lambda: scheduler.slot("chat"), keep_slot=slot_held,
+            )
+            try:
+                if "text/event-stream" not in r.headers.get("content-type", ""):
+                    # Server ignored stream: whole completion in one JSON body
+                    data = json.loads(await r.aread())
+                    parts.append(data.get("choices", [{}])[0].get("message", {}).get("content", "{}"))
+                    for item in parser.feed(parts[0]):
+                        yield item
+                else:
+                    async for line in r.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[5:].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            delta = json.loads(data)["choices"][0].get("delta", {}).get("content") or ""
+                        except (ValueError, KeyError, IndexError, TypeError):
+                            continue
+                        if delta:
+                            parts.append(delta)
+                            for item in parser.feed(delta):
+                                yield item
+            finally:
+                await r.aclose()
+    content = "".join(parts) or "{}"
+    parsed = _parse_story_content(content)
+    if cache_key:
+        await asyncio.to_thread(chat_cache.put, cache_key, content)  # only completions that parsed
+    yield "story", parsed
+
+
 async def generate_image(
     prompt: str,
     width: int = 1024,
@@ -127,7 +276,12 @@ async def generate_image(
     encoded = urllib.parse.quote(safe_prompt)
     url = f"{IMAGE_BASE}/{encoded}"
     params = _image_params(prompt, width, height, model=model)
-    async with httpx.AsyncClient(timeout=180.0) as client:
-        r = await client.get(url, params=params)
-        r.raise_for_status()
-        return r.content
+    timeout = httpx.Timeout(POLLINATIONS_IMAGE_TIMEOUT, connect=POLLINATIONS_CONNECT_TIMEOUT)
+    client = get_client()
+    req = client.build_request("GET", url, params=params, timeout=timeout)
+    pool = f"image:{model}"
+    with STAGE_SECONDS.time(stage=pool):
+        r = await call_with_resilience(
+            pool, _paced(pool, lambda: client.send(req)), hedge=POLLINATIONS_HEDGE, slot=lambda: scheduler.slot(pool)
+        )
+    return r.content
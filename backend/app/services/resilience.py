@@ -0,0 +1,265 @@
+"""Resilience for upstream HTTP calls: retries with jittered backoff (honoring Retry-After),
+optional hedged duplicate requests for the latency tail, and a per-endpoint circuit breaker.
+
+Decisions are reported to listeners registered with add_listener(fn) as fn(event, endpoint, info):
+  "retry" (attempt, delay, reason), "hedge" (delay), "hedge_won", "circuit_open", "circuit_half_open",
+  "circuit_closed", "circuit_rejected"; the upstream scheduler adds "throttled" (rate).
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, AsyncExitStack
+from email.utils import parsedate_to_datetime
+from typing import Any, Optional
+
+import httpx
+
+from app.config import (
+    POLLINATIONS_MAX_RETRIES,
+    POLLINATIONS_BACKOFF_BASE,
+    POLLINATIONS_BACKOFF_MAX,
+    POLLINATIONS_HEDGE_PERCENTILE,
+    POLLINATIONS_HEDGE_MIN_DELAY,
+    POLLINATIONS_BREAKER_THRESHOLD,
+    POLLINATIONS_BREAKER_RESET,
+)
+
+Listener = Callable[[str, str, dict[str, Any]], None]
+_listeners: list[Listener] = []
+
+
+class CircuitOpenError(Exception):
+    """Endpoint is failing; request rejected without calling upstream."""
+
+
+def add_listener(fn: Listener) -> None:
+    _listeners.append(fn)
+
+
+def report_event(event: str, endpoint: str, **info: Any) -> None:
+    if event != "hedge_won":
+        print(f"[StoryTale] upstream {endpoint}: {event} {info if info else ''}".rstrip())
+    for fn in _listeners:
+        try:
+            fn(event, endpoint, info)
+        except Exception:
+            pass
+
+
+class CircuitBreaker:
+    """closed -> open after `threshold` consecutive failures; after `reset_after` s one trial (half-open)."""
+
+    def __init__(self, endpoint: str, threshold: int = POLLINATIONS_BREAKER_THRESHOLD, reset_after: float = POLLINATIONS_BREAKER_RESET):
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_after:
+            self.state = "half_open"
+            self._trial_in_flight = False
+            report_event("circuit_half_open", self.endpoint)
+        if self.state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            report_event("circuit_closed", self.endpoint)
+        self.state = "closed"
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a half-open trial that ended without a verdict (cancelled, or 429), so the next call can try."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or (self.state == "closed" and self._failures >= self.threshold):
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            report_event("circuit_open", self.endpoint, failures=self._failures)
+
+
+class LatencyWindow:
+    """Recent successful latencies (seconds) for percentile-based hedge delays."""
+
+    def __init__(self, size: int = 200):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int = 20) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_latencies: dict[str, LatencyWindow] = {}
+
+
+def breaker(endpoint: str) -> CircuitBreaker:
+    if endpoint not in _breakers:
+        _breakers[endpoint] = CircuitBreaker(endpoint)
+    return _breakers[endpoint]
+
+
+def _latency(endpoint: str) -> LatencyWindow:
+    if endpoint not in _latencies:
+        _latencies[endpoint] = LatencyWindow()
+    return _latencies[endpoint]
+
+
+def _retryable_status(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Retry-After as seconds (delta-seconds or HTTP date), or None."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter: uniform(0, min(max, base * 2^attempt))."""
+    return random.uniform(0, min(POLLINATIONS_BACKOFF_MAX, POLLINATIONS_BACKOFF_BASE * (2 ** attempt)))
+
+
+async def _timed(endpoint: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    start = time.monotonic()
+    response = await send()
+    if response.is_success:
+        _latency(endpoint).add(time.monotonic() - start)
+    return response
+
+
+async def _hedged(endpoint: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """Send; if no answer within the endpoint's latency percentile, send a duplicate. First success wins."""
+    p = _latency(endpoint).percentile(POLLINATIONS_HEDGE_PERCENTILE)
+    first = asyncio.create_task(_timed(endpoint, send))
+    tasks = {first}
+    try:
+        if p is None:  # not enough samples yet to know what "slow" is
+            return await first
+        delay = max(POLLINATIONS_HEDGE_MIN_DELAY, p)
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+        report_event("hedge", endpoint, delay=round(delay, 2))
+        second = asyncio.create_task(_timed(endpoint, send))
+        tasks.add(second)
+        pending = {first, second}
+        result: Optional[httpx.Response] = None
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                response = task.result()
+                if response.is_success and (result is None or not result.is_success):
+                    if result is not None:
+                        await result.aclose()
+                    result = response
+                    if task is second:
+                        report_event("hedge_won", endpoint)
+                elif result is None:
+                    result = response
+                else:
+                    await response.aclose()
+            if result is not None and result.is_success:
+                break
+        if result is not None:
+            return result
+        assert error is not None
+        raise error
+    finally:
+        # Also on cancellation of the caller: asyncio.wait() leaves its tasks running
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def call_with_resilience(
+    endpoint: str,
+    send: Callable[[], Awaitable[httpx.Response]],
+    hedge: bool = False,
+    max_retries: int = POLLINATIONS_MAX_RETRIES,
+    slot: Optional[Callable[[], AbstractAsyncContextManager]] = None,
+    keep_slot: Optional[AsyncExitStack] = None,
+) -> httpx.Response:
+    """Run send() (one HTTP request) with circuit breaker, retries on transport errors / 429 / 5xx
+    and optional hedging. Returns a successful response; raises CircuitOpenError,
+    httpx.HTTPStatusError or the last transport error.
+    slot: factory of the scheduler slot, entered per attempt – never held while sleeping before a retry.
+    keep_slot: takes over the successful attempt's slot (e.g. until a streamed body is read); else it's
+    released on return."""
+    cb = breaker(endpoint)
+    for attempt in range(max_retries + 1):
+        async with AsyncExitStack() as held:
+            if slot is not None:
+                await held.enter_async_context(slot())
+            if not cb.allow():
+                report_event("circuit_rejected", endpoint)
+                raise CircuitOpenError(f"{endpoint} circuit open")
+            try:
+                response = await (_hedged(endpoint, send) if hedge else _timed(endpoint, send))
+            except httpx.TransportError as e:
+                cb.record_failure()
+                if attempt == max_retries:
+                    raise
+                delay, reason = _backoff(attempt), type(e).__name__
+            except BaseException as e:
+                # Never leave a half-open trial claimed: an unexpected error counts as a failure,
+                # cancellation (client went away, sibling task failed) says nothing about upstream
+                if isinstance(e, Exception):
+                    cb.record_failure()
+                else:
+                    cb.release()
+                raise
+            else:
+                if not _retryable_status(response.status_code):
+                    cb.record_success()  # includes other 4xx: upstream is up, the request is bad – not retried
+                    if not response.is_success:
+                        await response.aclose()
+                        response.raise_for_status()
+                    if keep_slot is not None:
+                        keep_slot.push_async_exit(held.pop_all())
+                    return response
+                if response.status_code >= 500:
+                    cb.record_failure()
+                else:
+                    cb.release()  # 429 = quota, not an outage: don't trip the breaker
+                await response.aclose()
+                if attempt == max_retries:
+                    response.raise_for_status()
+                retry_after = retry_after_seconds(response)
+                delay = min(POLLINATIONS_BACKOFF_MAX, retry_after) if retry_after is not None else _backoff(attempt)
+                reason = f"HTTP {response.status_code}"
+        report_event("retry", endpoint, attempt=attempt + 1, delay=round(delay, 2), reason=reason)
+        await asyncio.sleep(delay)  # slot already released
+    raise RuntimeError("unreachable")
@@ -0,0 +1,177 @@
+"""Process-wide scheduler for upstream (Pollinations) requests.
+
+Every HTTP attempt takes a slot in its pool ("chat", "image:<model>"), released before a retry backs
+off: slots are limited per pool and handed out by priority (interactive before background, FIFO within
+a class). Each attempt also takes a token from the pool's bucket; the bucket rate halves on 429 and
+creeps back up on success (AIMD), so throughput settles at the quota ceiling instead of storming into
+rate limits.
+
+Priority is carried in a context variable so tasks spawned by a caller inherit it:
+
+    with upstream_priority("background"):
+        await story_service.generate(...)
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Literal
+
+from app.config import (
+    SCHED_CHAT_CONCURRENCY,
+    SCHED_IMAGE_CONCURRENCY,
+    SCHED_CHAT_RPS,
+    SCHED_IMAGE_RPS,
+    SCHED_BURST,
+)
+from app.metrics import UPSTREAM_QUEUE_SECONDS
+from app.services.resilience import report_event
+
+Priority = Literal["interactive", "background"]
+_PRIORITY_ORDER = {"interactive": 0, "background": 1}
+_priority: contextvars.ContextVar[Priority] = contextvars.ContextVar("upstream_priority", default="interactive")
+
+
+@contextmanager
+def upstream_priority(priority: Priority):
+    """Run upstream calls made in this block (and tasks created in it) at the given priority."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _PriorityPool:
+    """Semaphore whose waiters are woken in (priority, arrival) order."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: int) -> None:
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()  # slot was handed over just as we were cancelled: pass it on
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(None)  # hand the slot over; active count unchanged
+                return
+        self.active -= 1
+
+
+class _AdaptiveBucket:
+    """Token bucket; rate halves on 429 (down to min_rate) and grows additively on success (up to max_rate)."""
+
+    def __init__(self, rate: float, burst: float):
+        self.max_rate = rate
+        self.min_rate = rate / 16
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    async def take(self) -> None:
+        async with self._lock:  # FIFO among takers
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def throttled(self) -> None:
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = min(self._tokens, 0.0)
+
+    def succeeded(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+
+
+class UpstreamScheduler:
+    def __init__(self):
+        self._pools: dict[str, _PriorityPool] = {}
+        self._buckets: dict[str, _AdaptiveBucket] = {}
+
+    def _config(self, pool: str) -> tuple[int, float]:
+        if pool == "chat":
+            return SCHED_CHAT_CONCURRENCY, SCHED_CHAT_RPS
+        return SCHED_IMAGE_CONCURRENCY, SCHED_IMAGE_RPS
+
+    def _pool(self, pool: str) -> _PriorityPool:
+        if pool not in self._pools:
+            limit, rate = self._config(pool)
+            self._pools[pool] = _PriorityPool(limit)
+            if rate > 0:
+                self._buckets[pool] = _AdaptiveBucket(rate, SCHED_BURST)
+        return self._pools[pool]
+
+    @asynccontextmanager
+    async def slot(self, pool: str):
+        """Hold one of the pool's concurrency slots for one upstream attempt (and the streamed body it returns);
+        see call_with_resilience(slot=...): not held while a retry waits out its backoff."""
+        p = self._pool(pool)
+        with UPSTREAM_QUEUE_SECONDS.time(pool=pool):
+            await p.acquire(_PRIORITY_ORDER[_priority.get()])
+        try:
+            yield
+        finally:
+            p.release()
+
+    async def before_attempt(self, pool: str) -> None:
+        """Wait for a rate token before each HTTP attempt."""
+        self._pool(pool)
+        bucket = self._buckets.get(pool)
+        if bucket is not None:
+            await bucket.take()
+
+    def after_attempt(self, pool: str, status_code: int) -> None:
+        """Adapt the pool's rate to the upstream answer."""
+        bucket = self._buckets.get(pool)
+        if bucket is None:
+            return
+        if status_code == 429:
+            bucket.throttled()
+            report_event("throttled", pool, rate=round(bucket.rate, 3))
+        elif status_code < 400:
+            bucket.succeeded()
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per pool: active slots, queued callers, current rate (requests/s, 0 = unlimited)."""
+        return {
+            name: {
+                "active": p.active,
+                "waiting": p.waiting,
+                "rate": self._buckets[name].rate if name in self._buckets else 0.0,
+            }
+            for name, p in self._pools.items()
+        }
+
+
+scheduler = UpstreamScheduler()
@@ -1,11 +1,13 @@
 """Story generation: Pollinations -> images -> SQLite."""
 import asyncio
-import base64
-from typing import Optional
+from collections.abc import AsyncIterator
+from typing import Any, Optional
 
-from app.db import StoryRepository
+from app.config import IMAGE_CONCURRENCY
+from app.db import StoryRepository, image_url
 from app.models import GenerateStoryResponse, EpisodeOut
-from app.services.pollinations import generate_story_json, generate_image
+from app.services.pollinations import stream_story_json, generate_image
+from app.services.thumbnails import make_thumbnail
 
 
 class StoryService:
@@ -19,50 +21,130 @@ class StoryService:
         story_lang: str = "en",
         image_model: str = "flux",
         image_style: str | None = None,
+        seed: int | None = None,
     ) -> GenerateStoryResponse:
-        """Generate story JSON, then image per episode, save to DB, return response."""
+        """Generate story JSON, then episode images concurrently, save to DB, return response.
+        seed: reproducible story text (see pollinations.stream_story_json)."""
+        story_id, title = "", ""
+        episodes: dict[int, EpisodeOut] = {}
+        async for event in self.generate_events(
+            topic, num_episodes, story_lang, image_model, image_style, seed=seed
+        ):
+            if event["event"] == "story":
+                story_id, title = event["storyId"], event["title"]
+            elif event["event"] == "episode":
+                episodes[event["index"]] = EpisodeOut(text=event["text"], imageUrl=event["imageUrl"])
+        return GenerateStoryResponse(
+            storyId=story_id, title=title, episodes=[episodes[i] for i in sorted(episodes)]
+        )
+
+    async def generate_events(
+        self,
+        topic: str,
+        num_episodes: int,
+        story_lang: str = "en",
+        image_model: str = "flux",
+        image_style: str | None = None,
+        seed: int | None = None,
+        save: bool = True,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Generate a story, yielding progress events as each part is ready:
+        {"event": "story", storyId, title, num_episodes} as soon as the story JSON is parsed,
+        {"event": "episode", index, text, imageUrl} per episode as its image finishes (any order),
+        {"event": "saved", storyId} once the story is in SQLite.
+        save=False: last event is {"event": "ready", "story": save_story kwargs} instead, for the caller
+        to write (e.g. many at once with repo.save_stories); images are already stored either way."""
         lang = story_lang if story_lang in ("en", "th") else "en"
-        story_data = await generate_story_json(topic, num_episodes, story_lang=lang)
-        title = story_data["title"]
-        episodes_data = story_data["episodes"][:num_episodes]
         model = image_model if image_model in ("flux", "zimage") else "flux"
-        character_description = (story_data.get("characterDescription") or "").strip()
-        art_style = (story_data.get("artStyle") or "").strip()
-        if character_description or art_style:
-            print(f"[StoryTale] Image model: {model}, consistent: characters={bool(character_description)}, artStyle={bool(art_style)}")
-        else:
-            print(f"[StoryTale] Image model: {model}")
+        sem = asyncio.Semaphore(IMAGE_CONCURRENCY)
 
-        episodes_out: list[EpisodeOut] = []
-        episodes_for_db: list[tuple[str, str, Optional[str]]] = []
+        # Episode images are fanned out concurrently (capped per story). Each image is stored as a blob
+        # (served from /api/image/{hash}) as soon as it arrives, so its URL works before the story is saved.
+        async def _episode_image(
+            i: int, image_prompt: str, character_description: str, art_style: str
+        ) -> tuple[int, Optional[bytes], Optional[str]]:
+            async with sem:
+                try:
+                    img_bytes = await generate_image(
+                        image_prompt,
+                        style_suffix=image_style,
+                        model=model,
+                        character_description=character_description or None,
+                        art_style=art_style or None,
+                    )
+                except Exception as e:
+                    print(f"[StoryTale] Image gen failed for episode {i}: {e}")
+                    return i, None, None
+            return i, img_bytes, await asyncio.to_thread(self.repo.put_image, img_bytes)
 
-        for i, ep in enumerate(episodes_data):
-            text = ep.get("text", "")
-            image_prompt = ep.get("imagePrompt", "children's book illustration")
-            try:
-                img_bytes = await generate_image(
-                    image_prompt,
-                    style_suffix=image_style,
-                    model=model,
-                    character_description=character_description or None,
-                    art_style=art_style or None,
-                )
-                # Return as data URL so frontend can display without extra storage
-                b64 = base64.b64encode(img_bytes).decode("ascii")
-                image_url = f"data:image/jpeg;base64,{b64}"
-            except Exception as e:
-                print(f"[StoryTale] Image gen failed for episode {i}: {e}")
-                image_url = ""
-            episodes_out.append(EpisodeOut(text=text, imageUrl=image_url))
-            episodes_for_db.append((text, image_url, image_prompt))
+        tasks: dict[int, asyncio.Task] = {}
+        try:
+            # The story JSON is streamed: an episode's image starts as soon as its imagePrompt is complete
+            # and the shared characterDescription/artStyle (written before the episodes) are known.
+            story_data: dict[str, Any] = {}
+            style: dict[str, str] = {}
+            ready: dict[int, str] = {}
+            async for kind, value in stream_story_json(topic, num_episodes, story_lang=lang, seed=seed):
+                if kind in ("characterDescription", "artStyle"):
+                    style[kind] = str(value or "").strip()
+                elif kind == "episode" and value[0] < num_episodes and isinstance(value[1], dict):
+                    ready[value[0]] = value[1].get("imagePrompt", "children's book illustration")
+                elif kind == "story":
+                    story_data = value
+                if len(style) == 2:
+                    for i, prompt in ready.items():
+                        if i not in tasks:
+                            tasks[i] = asyncio.create_task(
+                                _episode_image(i, prompt, style["characterDescription"], style["artStyle"])
+                            )
 
-        story_id = StoryRepository.new_id()
-        await asyncio.to_thread(
-            self.repo.save_story,
-            story_id=story_id,
-            topic=topic,
-            title=title,
-            num_episodes=len(episodes_out),
-            episodes=episodes_for_db,
-        )
-        return GenerateStoryResponse(storyId=story_id, title=title, episodes=episodes_out)
+            title = story_data["title"]
+            episodes_data = story_data["episodes"][:num_episodes]
+            character_description = (story_data.get("characterDescription") or "").strip()
+            art_style = (story_data.get("artStyle") or "").strip()
+            if character_description or art_style:
+                print(f"[StoryTale] Image model: {model}, consistent: characters={bool(character_description)}, artStyle={bool(art_style)}, started early: {len(tasks)}")
+            else:
+                print(f"[StoryTale] Image model: {model}, started early: {len(tasks)}")
+
+            story_id = StoryRepository.new_id()
+            texts = [ep.get("text", "") for ep in episodes_data]
+            prompts = [ep.get("imagePrompt", "children's book illustration") for ep in episodes_data]
+            yield {"event": "story", "storyId": story_id, "title": title, "num_episodes": len(texts)}
+
+            for i, prompt in enumerate(prompts):
+                if i not in tasks:
+                    tasks[i] = asyncio.create_task(_episode_image(i, prompt, character_description, art_style))
+
+            hashes: list[Optional[str]] = [None] * len(prompts)
+            thumb_source: tuple[int, Optional[bytes]] = (len(prompts), None)  # first episode that has an image
+            for next_done in asyncio.as_completed([tasks[i] for i in range(len(prompts))]):
+                i, img_bytes, image_hash = await next_done
+                hashes[i] = image_hash
+                if img_bytes and i < thumb_source[0]:
+                    thumb_source = (i, img_bytes)
+                yield {"event": "episode", "index": i, "text": texts[i], "imageUrl": image_url(image_hash)}
+        finally:
+            for task in tasks.values():  # failure, or consumer went away (client disconnected): stop images
+                task.cancel()
+
+        # List thumbnail from the first available image (generated once, stored with the story)
+        thumbnail_hash = None
+        if thumb_source[1]:
+            thumbnail = await asyncio.to_thread(make_thumbnail, thumb_source[1])
+            if thumbnail:
+                thumbnail_hash = await asyncio.to_thread(self.repo.put_image, thumbnail)
+
+        record = {
+            "story_id": story_id,
+            "topic": topic,
+            "title": title,
+            "num_episodes": len(texts),
+            "episodes": list(zip(texts, hashes, prompts)),
+            "thumbnail_hash": thumbnail_hash,
+        }
+        if not save:
+            yield {"event": "ready", "story": record}
+            return
+        await asyncio.to_thread(self.repo.save_story, **record)
+        yield {"event": "saved", "storyId": story_id}
@@ -0,0 +1,27 @@
+"""Small JPEG thumbnails for the story list (Pillow, sync – wrap in to_thread)."""
+import io
+from typing import Optional
+
+from app.config import THUMBNAIL_SIZE
+
+
+# Lazy import Pillow (only needed when saving a story)
+def _pil_image():
+    from PIL import Image
+    return Image
+
+
+def make_thumbnail(data: bytes, size: int = THUMBNAIL_SIZE, quality: int = 80) -> Optional[bytes]:
+    """Return a JPEG thumbnail (longest side = size) of image bytes, or None if it cannot be decoded."""
+    Image = _pil_image()
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (size, size))  # JPEG: decode at reduced scale, much cheaper than full decode
+            img = img.convert("RGB")
+            img.thumbnail((size, size))
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=quality, optimize=True)
+            return out.getvalue()
+    except Exception as e:
+        print(f"[StoryTale] Thumbnail failed: {e}")
+        return None
@@ -1,19 +1,20 @@
 """Edge TTS – generate audio from text."""
-import pathlib
-import tempfile
+from collections.abc import AsyncIterator
+
 import edge_tts
 
 # Thai voice; fallback to English if needed
 DEFAULT_VOICE = "th-TH-PremwadeeNeural"
 
 
-async def text_to_audio(text: str, voice: str = DEFAULT_VOICE) -> bytes:
-    """Return MP3 bytes for the given text. edge_tts.save() รับ path เท่านั้น ไม่รับ BytesIO."""
+async def stream_audio(text: str, voice: str = DEFAULT_VOICE) -> AsyncIterator[bytes]:
+    """Yield MP3 chunks as Edge TTS produces them (playback can start after the first chunk)."""
     communicate = edge_tts.Communicate(text, voice)
-    with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as f:
-        path = f.name
-    try:
-        await communicate.save(path)
-        return pathlib.Path(path).read_bytes()
-    finally:
-        pathlib.Path(path).unlink(missing_ok=True)
+    async for chunk in communicate.stream():
+        if chunk.get("type") == "audio" and chunk.get("data"):
+            yield chunk["data"]
+
+
+async def text_to_audio(text: str, voice: str = DEFAULT_VOICE) -> bytes:
+    """Return MP3 bytes for the given text (collected from the stream; no temp file)."""
+    return b"".join([chunk async for chunk in stream_audio(text, voice)])
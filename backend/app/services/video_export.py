@@ -1,10 +1,34 @@
-"""Export story to MP4: image per episode + Edge TTS audio, concatenate with moviepy."""
-import base64
-import io
-import tempfile
+"""Export story to MP4: image per episode + Edge TTS audio.
+
+build_story_video (async) is the entry point used by app.services.export_jobs: it prepares TTS + images
+and runs the CPU-bound encode steps through a caller-supplied executor (a process pool).
+The ffmpeg encoder makes one still-image segment per episode and joins them with the concat demuxer;
+moviepy is the fallback. Finished videos and ffmpeg segments are cached on disk (video_cache), keyed by
+content hash, so a saved story is encoded once and a changed episode only re-encodes its own segment.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import subprocess
+import time
+from collections.abc import Awaitable
 from pathlib import Path
+from typing import Any, Callable, Optional
+
+from app.config import VIDEO_ENCODER, VIDEO_STILL_FPS, VIDEO_CACHE_DIR, VIDEO_CACHE_MAX_MB
+from app.db import StoryRepository, get_db_path
+from app.metrics import CACHE_REQUESTS, STAGE_SECONDS
+from app.services.audio_cache import audio_cache
+from app.services.disk_cache import DiskLRU
+from app.services.tts import DEFAULT_VOICE
 
-from app.services.tts import text_to_audio
+video_cache = DiskLRU(
+    Path(VIDEO_CACHE_DIR or get_db_path().parent / "video_cache"), VIDEO_CACHE_MAX_MB * 1024 * 1024, ".mp4", name="video"
+)  # whole videos and per-episode segments share the budget (and the eviction label)
+
+# Runs a sync function off the event loop and awaits it, e.g. functools.partial(loop.run_in_executor, pool)
+RunCpu = Callable[..., Awaitable[Any]]
 
 
 def _ep_text(ep) -> str:
@@ -22,63 +46,305 @@ def _moviepy():
     return ImageClip, AudioFileClip, concatenate_videoclips, ColorClip
 
 
-def _data_url_to_image_path(data_url: str, dir_path: Path, index: int) -> Path:
-    """Decode data URL to JPEG file; return path."""
-    if not data_url.startswith("data:image"):
-        raise ValueError("Not a data URL")
-    payload = data_url.split(",", 1)[1]
-    raw = base64.b64decode(payload)
+def _image_url_to_path(repo: StoryRepository, image_url: str, dir_path: Path, index: int) -> Path:
+    """Write the episode image (blob from the store, or legacy data URL) to a file; return path."""
+    raw = repo.get_image_by_url(image_url)
+    if not raw:
+        raise ValueError("Image not found")
     path = dir_path / f"ep{index}.jpg"
     path.write_bytes(raw)
     return path
 
 
-async def export_story_to_mp4(story: dict) -> bytes:
+async def _prepare_episode(
+    repo: StoryRepository, index: int, text: str, image_url: str, work_dir: Path
+) -> tuple[Optional[str], str]:
+    """Audio (via the TTS cache) + image for one episode in work_dir; returns (image_path or None, audio_path).
+    File copies and the SQLite blob read run in threads, off the event loop."""
+    cached, _ = await audio_cache.get(text)
+    audio_path = work_dir / f"ep{index}.mp3"
+    await asyncio.to_thread(shutil.copyfile, cached, audio_path)  # private copy: eviction can't pull it mid-encode
+    img_path: Optional[str] = None
+    if image_url:
+        try:
+            img_path = str(await asyncio.to_thread(_image_url_to_path, repo, image_url, work_dir, index))
+        except Exception:
+            img_path = None
+    return img_path, str(audio_path)
+
+
+async def prepare_segments(
+    story: dict,
+    work_dir: Path,
+    repo: Optional[StoryRepository] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+) -> list[tuple[Optional[str], str]]:
     """
     story: dict with episodes: [{ text, imageUrl }].
-    Returns MP4 file bytes.
+    Write per-episode audio (via the TTS cache) and image into work_dir.
+    Returns [(image_path or None, audio_path)] for episodes with text.
     """
-    ImageClip, AudioFileClip, concatenate_videoclips, ColorClip = _moviepy()
+    repo = repo or StoryRepository()
     episodes = story.get("episodes", [])
     if not episodes:
         raise ValueError("No episodes")
+    segments: list[tuple[Optional[str], str]] = []
+    for i, ep in enumerate(episodes):
+        text = _ep_text(ep)
+        if not text:
+            continue
+        segments.append(await _prepare_episode(repo, i, text, _ep_image_url(ep), work_dir))
+        if on_progress:
+            on_progress((i + 1) / len(episodes))
+    if not segments:
+        raise ValueError("No valid clips")
+    return segments
+
+
+def _progress_logger(progress_path: str):
+    """proglog logger that writes the video frame progress (0..1) to a file the parent process polls."""
+    from proglog import ProgressBarLogger
+
+    class _FileProgressLogger(ProgressBarLogger):
+        _last = 0.0
+
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if bar != "frame_index" or attr != "index":
+                return
+            total = self.bars[bar].get("total") or 0
+            now = time.monotonic()
+            if total and now - self._last >= 0.5:
+                self._last = now
+                Path(progress_path).write_text(f"{min(1.0, value / total):.3f}")
+
+    return _FileProgressLogger()
+
+
+def _ffmpeg_exe() -> str:
+    """System ffmpeg, else the binary bundled with imageio-ffmpeg (a moviepy dependency)."""
+    exe = shutil.which("ffmpeg")
+    if exe:
+        return exe
+    import imageio_ffmpeg
+    return imageio_ffmpeg.get_ffmpeg_exe()
+
+
+# Every segment gets identical stream parameters so the concat demuxer can stream-copy them
+_SIZE = 1024
+_SEGMENT_VIDEO_FILTER = (
+    f"scale={_SIZE}:{_SIZE}:force_original_aspect_ratio=decrease,"
+    f"pad={_SIZE}:{_SIZE}:(ow-iw)/2:(oh-ih)/2:white,format=yuv420p"
+)
+
+
+def _run_ffmpeg(ffmpeg: str, args: list[str]) -> None:
+    proc = subprocess.run([ffmpeg, "-y", "-loglevel", "error", *args], capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited {proc.returncode}: {proc.stderr.decode(errors='replace')[-500:]}")
+
+
+def _ffmpeg_segment_args(img_path: Optional[str], audio_path: str, out_path: str, fps: int) -> list[str]:
+    if img_path:
+        video_in = ["-loop", "1", "-framerate", str(fps), "-i", img_path]
+    else:
+        video_in = ["-f", "lavfi", "-i", f"color=c=white:s={_SIZE}x{_SIZE}:r={fps}"]
+    return [
+        *video_in,
+        "-i", audio_path,
+        "-map", "0:v", "-map", "1:a",
+        "-vf", _SEGMENT_VIDEO_FILTER, "-r", str(fps),
+        "-c:v", "libx264", "-tune", "stillimage", "-preset", "veryfast", "-crf", "23",
+        "-c:a", "aac", "-b:a", "128k", "-ar", "44100", "-ac", "2",
+        "-shortest", out_path,
+    ]
+
+
+def encode_segment_ffmpeg(img_path: Optional[str], audio_path: str, out_path: str, fps: int = VIDEO_STILL_FPS) -> None:
+    """Encode one episode as a low-fps still-image MP4 segment."""
+    _run_ffmpeg(_ffmpeg_exe(), _ffmpeg_segment_args(img_path, audio_path, out_path, fps))
+
+
+def concat_segments_ffmpeg(seg_paths: list[str], out_path: str) -> None:
+    """Join segments with identical stream parameters using the concat demuxer (stream copy, no re-encode)."""
+    out = Path(out_path)
+    list_path = out.with_name(f"{out.name}.txt")
+    list_path.write_text("".join(f"file '{Path(p).resolve()}'\n" for p in seg_paths))
+    try:
+        _run_ffmpeg(_ffmpeg_exe(), [
+            "-f", "concat", "-safe", "0", "-i", str(list_path),
+            "-c", "copy", "-movflags", "+faststart", str(out),
+        ])
+    finally:
+        list_path.unlink(missing_ok=True)
+
+
+def encode_mp4_ffmpeg(
+    segments: list[tuple[Optional[str], str]],
+    out_path: str,
+    progress_path: Optional[str] = None,
+    fps: int = VIDEO_STILL_FPS,
+) -> None:
+    """One low-fps still-image segment per episode, then join with the concat demuxer (stream copy)."""
+    out = Path(out_path)
+    seg_dir = out.parent / f"{out.stem}_segments"
+    seg_dir.mkdir(exist_ok=True)
+    try:
+        seg_paths = []
+        for i, (img_path, audio_path) in enumerate(segments):
+            seg_path = seg_dir / f"seg{i}.mp4"
+            encode_segment_ffmpeg(img_path, audio_path, str(seg_path), fps)
+            seg_paths.append(str(seg_path))
+            if progress_path:
+                Path(progress_path).write_text(f"{(i + 1) / (len(segments) + 1):.3f}")
+        concat_segments_ffmpeg(seg_paths, str(out))
+    finally:
+        shutil.rmtree(seg_dir, ignore_errors=True)
+
+
+def encode_mp4_moviepy(
+    segments: list[tuple[Optional[str], str]], out_path: str, progress_path: Optional[str] = None
+) -> None:
+    """Original path: ImageClip per episode, concatenated and re-encoded at 24 fps with moviepy."""
+    ImageClip, AudioFileClip, concatenate_videoclips, ColorClip = _moviepy()
+    clips = []
+    for img_path, audio_path in segments:
+        audio_clip = AudioFileClip(audio_path)
+        duration = audio_clip.duration
+        img_clip = None
+        if img_path:
+            try:
+                img_clip = ImageClip(img_path).with_duration(duration).with_audio(audio_clip)
+            except Exception:
+                img_clip = None
+        if img_clip is None:
+            img_clip = ColorClip(size=(1024, 1024), color=(255, 255, 255), duration=duration).with_audio(audio_clip)
+        clips.append(img_clip)
+        # อย่า close audio_clip ที่นี่ — img_clip ยังอ้างถึงอยู่ ตอน write_videofile จะได้ reader เป็น None
+
+    final = concatenate_videoclips(clips)
+    logger = _progress_logger(progress_path) if progress_path else None
+    try:
+        final.write_videofile(out_path, fps=24, codec="libx264", audio_codec="aac", logger=logger)
+    finally:
+        final.close()
+        for c in clips:
+            try:
+                c.close()
+            except Exception:
+                pass
+
+
+def _encoder_settings(encoder: str) -> str:
+    """Everything that changes encoded output; part of every cache key (bump the version on format changes)."""
+    if encoder == "ffmpeg":
+        return f"ffmpeg:v1:size={_SIZE}:fps={VIDEO_STILL_FPS}:crf=23:aac128k"
+    return "moviepy:v1:fps=24"
+
+
+def segment_key(text: str, image_url: str, encoder: str, voice: str = DEFAULT_VOICE) -> str:
+    """Cache key of one encoded episode (image URLs are content-addressed; legacy data URLs hash their payload)."""
+    h = hashlib.sha256()
+    for part in (_encoder_settings(encoder), voice, text, image_url):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def story_video_key(segment_keys: list[str], encoder: str) -> str:
+    """Cache key of a whole exported video: its episodes' segment keys + encoder settings."""
+    return hashlib.sha256("\0".join(["story", _encoder_settings(encoder), *segment_keys]).encode("utf-8")).hexdigest()
+
+
+def _hold_segment(seg: Path, held: Path) -> bool:
+    """Hard-link (or copy) a cached segment into the job's work_dir so eviction can't remove it before
+    the concat; False if it was already evicted."""
+    try:
+        os.link(seg, held)
+    except FileNotFoundError:
+        return False
+    except OSError:  # other filesystem, or no hard links
+        try:
+            shutil.copyfile(seg, held)
+        except FileNotFoundError:
+            return False
+    return True
+
+
+async def _poll_progress(progress_path: Path, on_progress: Callable[[float], None], start: float) -> None:
+    """Relay moviepy's progress file (written in the worker process) to on_progress, scaled to [start, 1]."""
+    while True:
+        await asyncio.sleep(0.5)
+        try:
+            on_progress(start + (1 - start) * float(progress_path.read_text() or 0))
+        except (OSError, ValueError):
+            pass
+
+
+async def build_story_video(
+    story: dict,
+    work_dir: Path,
+    run_cpu: RunCpu,
+    repo: Optional[StoryRepository] = None,
+    on_progress: Optional[Callable[[float], None]] = None,
+    encoder: str = VIDEO_ENCODER,
+) -> Path:
+    """
+    story: dict with episodes: [{ text, imageUrl }].
+    Return the path of the story's MP4 in video_cache, encoding only what is not cached yet.
+    work_dir: scratch space for TTS/image files. run_cpu: executes encode steps off the event loop.
+    """
+    repo = repo or StoryRepository()
+    report = on_progress or (lambda fraction: None)
+    episodes = [(i, _ep_text(ep), _ep_image_url(ep)) for i, ep in enumerate(story.get("episodes", []))]
+    episodes = [(i, text, url) for i, text, url in episodes if text]
+    if not episodes:
+        raise ValueError("No valid clips")
+    seg_keys = [segment_key(text, url, encoder) for _, text, url in episodes]
+    story_key = story_video_key(seg_keys, encoder)
+    cached = video_cache.lookup(story_key)
+    if cached is not None:
+        CACHE_REQUESTS.inc(cache="video", result="hit")
+        print(f"[StoryTale] Video cache hit for story {story.get('storyId')}")
+        return cached
+    CACHE_REQUESTS.inc(cache="video", result="miss")
+
+    tmp_out = video_cache.temp_path(story_key)
+    start = time.perf_counter()
+    try:
+        if encoder == "ffmpeg":
+            try:
+                seg_paths = []
+                for n, ((i, text, url), key) in enumerate(zip(episodes, seg_keys)):
+                    held = work_dir / f"seg{n}.mp4"  # our own link: the cache may evict its entry meanwhile
+                    seg = video_cache.lookup(key)
+                    if seg is not None and not await asyncio.to_thread(_hold_segment, seg, held):
+                        seg = None  # evicted right after the lookup: encode just this one again
+                    CACHE_REQUESTS.inc(cache="video_segment", result="miss" if seg is None else "hit")
+                    if seg is None:
+                        img_path, audio_path = await _prepare_episode(repo, i, text, url, work_dir)
+                        seg_tmp = video_cache.temp_path(key)
+                        try:
+                            with STAGE_SECONDS.time(stage="video_segment"):
+                                await run_cpu(encode_segment_ffmpeg, img_path, audio_path, str(seg_tmp))
+                            await asyncio.to_thread(_hold_segment, seg_tmp, held)
+                            await asyncio.to_thread(video_cache.commit, seg_tmp, key)
+                        finally:
+                            seg_tmp.unlink(missing_ok=True)
+                    seg_paths.append(str(held))
+                    report((n + 1) / (len(episodes) + 1))
+                await run_cpu(concat_segments_ffmpeg, seg_paths, str(tmp_out))
+                return await asyncio.to_thread(video_cache.commit, tmp_out, story_key)
+            except Exception as e:
+                print(f"[StoryTale] ffmpeg encoder failed, falling back to moviepy: {e}")
 
-    with tempfile.TemporaryDirectory() as tmp:
-        root = Path(tmp)
-        clips = []
-        for i, ep in enumerate(episodes):
-            text = _ep_text(ep)
-            image_url = _ep_image_url(ep)
-            if not text:
-                continue
-            audio_bytes = await text_to_audio(text)
-            audio_path = root / f"ep{i}.mp3"
-            audio_path.write_bytes(audio_bytes)
-            audio_clip = AudioFileClip(str(audio_path))
-            duration = audio_clip.duration
-            if image_url:
-                try:
-                    img_path = _data_url_to_image_path(image_url, root, i)
-                    img_clip = ImageClip(str(img_path)).with_duration(duration).with_audio(audio_clip)
-                except Exception:
-                    img_clip = ColorClip(size=(1024, 1024), color=(255, 255, 255), duration=duration).with_audio(audio_clip)
-            else:
-                img_clip = ColorClip(size=(1024, 1024), color=(255, 255, 255), duration=duration).with_audio(audio_clip)
-            clips.append(img_clip)
-            # อย่า close audio_clip ที่นี่ — img_clip ยังอ้างถึงอยู่ ตอน write_videofile จะได้ reader เป็น None
-
-        if not clips:
-            raise ValueError("No valid clips")
-        final = concatenate_videoclips(clips)
-        out_path = root / "story.mp4"
+        segments = await prepare_segments(story, work_dir, repo, on_progress=lambda f: report(0.2 * f))
+        progress_path = work_dir / "progress"
+        poller = asyncio.create_task(_poll_progress(progress_path, report, 0.2))
         try:
-            final.write_videofile(str(out_path), fps=24, codec="libx264", audio_codec="aac", logger=None)
-            return out_path.read_bytes()
+            await run_cpu(encode_mp4_moviepy, segments, str(tmp_out), str(progress_path))
         finally:
-            final.close()
-            for c in clips:
-                try:
-                    c.close()
-                except Exception:
-                    pass
-    return b""
+            poller.cancel()
+        return await asyncio.to_thread(video_cache.commit, tmp_out, story_key)
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage="video_encode")
+        tmp_out.unlink(missing_ok=True)
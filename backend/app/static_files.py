@@ -0,0 +1,113 @@
+"""Static layer for the bundled web app (STATIC_DIR): indexed once at startup, no per-request filesystem work.
+
+Per file: content-hash ETag (If-None-Match -> 304), Cache-Control (Vite's hashed /assets/ files are
+immutable, index.html always revalidates) and a br/gzip variant for Accept-Encoding. Precompressed
+siblings (app.js.br / app.js.gz, e.g. from a build plugin) are used when present; otherwise text
+assets are compressed once at index time and kept in memory.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+from app.compression import accepted_encodings, brotli
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SHORT = "public, max-age=3600"
+
+_MEDIA_TYPES = {
+    ".js": "text/javascript",
+    ".mjs": "text/javascript",
+    ".css": "text/css",
+    ".html": "text/html",
+    ".svg": "image/svg+xml",
+    ".json": "application/json",
+    ".webmanifest": "application/manifest+json",
+    ".woff2": "font/woff2",
+    ".txt": "text/plain",
+}
+_COMPRESSIBLE = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".webmanifest", ".txt", ".map", ".xml"}
+_MAX_IN_MEMORY = 4 * 1024 * 1024  # don't compress (and hold) anything bigger at startup
+_ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+
+@dataclass
+class StaticAsset:
+    path: Path
+    media_type: str
+    etag: str  # without quotes
+    cache_control: str
+    stat: os.stat_result
+    # encoding -> precompressed file on disk, or bytes compressed at index time
+    encoded: dict[str, Path | bytes] = field(default_factory=dict)
+
+
+def _cache_control(rel: str) -> str:
+    if rel.startswith("assets/"):
+        return IMMUTABLE  # Vite puts content-hashed bundles here
+    if rel.endswith(".html"):
+        return REVALIDATE
+    return SHORT
+
+
+class StaticIndex:
+    def __init__(self, root: Path):
+        self.root = root
+        self.assets: dict[str, StaticAsset] = {}
+
+    def build(self) -> None:
+        """Walk root once: stat, hash and (pre)compress every file."""
+        assets: dict[str, StaticAsset] = {}
+        if self.root.is_dir():
+            for path in sorted(self.root.rglob("*")):
+                if not path.is_file() or (path.suffix in (".br", ".gz") and path.with_suffix("").is_file()):
+                    continue
+                rel = path.relative_to(self.root).as_posix()
+                data = path.read_bytes()
+                asset = StaticAsset(
+                    path=path,
+                    media_type=_MEDIA_TYPES.get(path.suffix) or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                    etag=hashlib.sha256(data).hexdigest()[:32],
+                    cache_control=_cache_control(rel),
+                    stat=path.stat(),
+                )
+                for encoding, suffix in _ENCODING_SUFFIX.items():
+                    sibling = path.with_name(path.name + suffix)
+                    if sibling.is_file():
+                        asset.encoded[encoding] = sibling
+                if path.suffix in _COMPRESSIBLE and len(data) <= _MAX_IN_MEMORY and len(data) >= 256:
+                    if "gzip" not in asset.encoded:
+                        asset.encoded["gzip"] = gzip.compress(data, compresslevel=9, mtime=0)
+                    if "br" not in asset.encoded and brotli is not None:
+                        asset.encoded["br"] = brotli.compress(data, quality=11)
+                assets[rel] = asset
+        self.assets = assets
+        print(f"[StoryTale] Static index: {len(assets)} files from {self.root}")
+
+    def get(self, rel: str) -> Optional[StaticAsset]:
+        return self.assets.get(rel)
+
+    def response(self, asset: StaticAsset, request: Request) -> Response:
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in accepted and e in asset.encoded), None)
+        # Each encoding is a different representation: give it its own strong ETag
+        etag = f'"{asset.etag}-{encoding}"' if encoding else f'"{asset.etag}"'
+        headers = {"ETag": etag, "Cache-Control": asset.cache_control}
+        if asset.encoded:
+            headers["Vary"] = "Accept-Encoding"
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        if encoding is None:
+            return FileResponse(asset.path, media_type=asset.media_type, headers=headers, stat_result=asset.stat)
+        headers["Content-Encoding"] = encoding
+        body = asset.encoded[encoding]
+        if isinstance(body, Path):
+            return FileResponse(body, media_type=asset.media_type, headers=headers)
+        return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,291 @@
+"""End-to-end backend benchmark against a local fake Pollinations server and a stubbed edge_tts.
+
+Starts benchmarks.fake_pollinations on a free port, points the real FastAPI app at it (fresh temp DB and
+caches), drives the app in-process over ASGI and reports requests/s and p50/p95/p99 per endpoint
+(generate, get-story, list, audio cold/cached, export-video), peak RSS, and SQLite timings with
+10k / 100k stored stories (get_story both straight from SQLite and through the story cache).
+
+    cd backend
+    python -m benchmarks.bench_app [--stories 20] [--concurrency 4] [--db-sizes 10000 100000]
+    python -m benchmarks.bench_app --image-latency lognormal:3,0.6 --error-rate 0.05 --throttle-rate 0.02
+
+Admission and scheduler limits default to bench-friendly values (no per-client cap, no rate limit);
+set the STORYTELL_* env vars to benchmark a production configuration instead.
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.fake_pollinations import FakeConfig, add_arguments, config_from_args, create_app, install_fake_tts
+
+
+@dataclass
+class Result:
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    wall: float = 0.0
+
+    def pct(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    def row(self) -> str:
+        n = len(self.latencies)
+        rps = n / self.wall if self.wall else 0.0
+        ms = [self.pct(p) * 1000 for p in (0.50, 0.95, 0.99)]
+        return f"{self.name:>16} {n:>6} {self.errors:>6} {rps:>8.1f} {ms[0]:>9.1f} {ms[1]:>9.1f} {ms[2]:>9.1f}"
+
+
+async def run_load(name: str, n: int, concurrency: int, request) -> Result:
+    """Call `await request(i)` for i in range(n) with at most `concurrency` in flight; request returns ok: bool."""
+    result = Result(name)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                ok = await request(i)
+            except Exception as e:
+                print(f"  {name} #{i} failed: {e}", file=sys.stderr)
+                ok = False
+            result.latencies.append(time.perf_counter() - t0)
+            result.errors += 0 if ok else 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    result.wall = time.perf_counter() - start
+    return result
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_fake_server(cfg: FakeConfig) -> str:
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(create_app(cfg), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+def _fake_mp3(seconds: float) -> bytes:
+    from app.services.video_export import _ffmpeg_exe, _run_ffmpeg
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tone.mp3")
+        _run_ffmpeg(_ffmpeg_exe(), ["-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}", "-q:a", "5", path])
+        with open(path, "rb") as f:
+            return f.read()
+
+
+async def bench_http(args) -> list[Result]:
+    import httpx
+
+    from app.main import app
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+            story_ids: list[str] = []
+
+            async def generate(i: int) -> bool:
+                r = await client.post("/api/story/generate", json={"topic": f"bench topic {i}", "num_episodes": args.episodes})
+                if r.status_code == 200:
+                    story_ids.append(r.json()["storyId"])
+                return r.status_code == 200
+
+            results.append(await run_load("generate", args.stories, args.concurrency, generate))
+            if not story_ids:
+                return results
+
+            async def get_story(i: int) -> bool:
+                r = await client.get(f"/api/story/{random.choice(story_ids)}")
+                return r.status_code == 200
+
+            results.append(await run_load("get-story", args.reads, 16, get_story))
+
+            cursor: list[str | None] = [None]
+
+            async def list_page(i: int) -> bool:
+                params = {"limit": 20}
+                if cursor[0]:
+                    params["cursor"] = cursor[0]
+                r = await client.get("/api/stories", params=params)
+                cursor[0] = r.headers.get("x-next-cursor")
+                return r.status_code == 200
+
+            results.append(await run_load("list", args.reads, 1, list_page))
+
+            async def audio(i: int) -> bool:
+                r = await client.get(f"/api/story/{story_ids[i % len(story_ids)]}/episode/0/audio")
+                return r.status_code == 200 and len(r.content) > 0
+
+            results.append(await run_load("audio (cold)", len(story_ids), args.concurrency, audio))
+            results.append(await run_load("audio (cached)", args.reads, 16, audio))
+
+            async def export(i: int) -> bool:
+                r = await client.post("/api/story/export-video", json={"storyId": story_ids[i % len(story_ids)]})
+                if r.status_code != 202:
+                    return False
+                job_id = r.json()["jobId"]
+                while True:
+                    await asyncio.sleep(0.2)
+                    status = (await client.get(f"/api/story/export-video/{job_id}")).json()["status"]
+                    if status in ("done", "failed"):
+                        return status == "done"
+
+            results.append(await run_load("export-video", min(args.exports, len(story_ids)), args.exports, export))
+    return results
+
+
+def _seed_stories(repo, target: int, episodes: int) -> None:
+    """Bulk-insert synthetic stories until the DB holds `target` (images shared, timestamps in the past)."""
+    conn = repo._conn()
+    have = conn.execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+    image_hashes = [row[0] for row in conn.execute("SELECT hash FROM images LIMIT 16")] or [None]
+    base = datetime.now(timezone.utc) - timedelta(days=365)
+    batch = 10_000
+    for start in range(have, target, batch):
+        stories, eps = [], []
+        for k in range(start, min(target, start + batch)):
+            story_id = uuid.uuid4().hex
+            created = (base + timedelta(seconds=k)).isoformat()
+            stories.append((story_id, f"topic {k}", f"Seeded story {k}", episodes, created, random.choice(image_hashes)))
+            eps.extend(
+                (story_id, i, f"Seeded episode {i} of story {k}. " * 3, "", "a scene", random.choice(image_hashes))
+                for i in range(episodes)
+            )
+        with conn:
+            conn.executemany(
+                "INSERT INTO stories (id, topic, title, num_episodes, created_at, thumbnail_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                stories,
+            )
+            conn.executemany(
+                "INSERT INTO episodes (story_id, ordinal, text, image_url, image_prompt, image_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                eps,
+            )
+
+
+def _time_op(name: str, reps: int, fn) -> Result:
+    result = Result(name)
+    start = time.perf_counter()
+    for i in range(reps):
+        t0 = time.perf_counter()
+        fn(i)
+        result.latencies.append(time.perf_counter() - t0)
+    result.wall = time.perf_counter() - start
+    return result
+
+
+def bench_sqlite(sizes: list[int], reps: int, episodes: int) -> list[tuple[int, list[Result]]]:
+    from app.db import StoryRepository, encode_cursor
+
+    repo = StoryRepository()
+    out = []
+    for size in sorted(s for s in sizes if s > 0):
+        t0 = time.perf_counter()
+        _seed_stories(repo, size, episodes)
+        print(f"  seeded {size} stories in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+        conn = repo._conn()
+        ids = [row[0] for row in conn.execute("SELECT id FROM stories ORDER BY RANDOM() LIMIT ?", (reps,))]
+        mid_id, mid_created = conn.execute(
+            "SELECT id, created_at FROM stories ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?", (size // 2,)
+        ).fetchone()
+        mid_cursor = encode_cursor(mid_created, mid_id)
+        image = os.urandom(64 * 1024)
+        for story_id in ids:
+            repo.get_story(story_id)
+        results = [
+            # SQLite read only (what the indexes decide); then through the in-memory story cache, warmed first
+            _time_op("get_story sqlite", reps, lambda i: repo._load_story(ids[i % len(ids)])),
+            _time_op("get_story cached", reps, lambda i: repo.get_story(ids[i % len(ids)])),
+            _time_op("list first page", reps, lambda i: repo.list_stories(20)),
+            _time_op("list cursor mid", reps, lambda i: repo.list_stories(20, cursor=mid_cursor)),
+            _time_op("list offset mid", max(1, reps // 10), lambda i: repo.list_stories(20, offset=size // 2)),
+            _time_op("save_story", reps, lambda i: repo.save_story(
+                repo.new_id(), "bench", "Bench story", episodes, [("text", None, "prompt")] * episodes
+            )),
+            _time_op("put_image", reps, lambda i: repo.put_image(image + i.to_bytes(4, "big"))),
+        ]
+        out.append((size, results))
+    return out
+
+
+def _peak_rss_mb() -> tuple[float, float]:
+    """(this process, largest child e.g. encoder) peak RSS in MB (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    scale = 1 / (1024 * 1024) if sys.platform == "darwin" else 1 / 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--stories", type=int, default=20, help="stories to generate")
+    parser.add_argument("--episodes", type=int, default=5, help="episodes per story")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent generate/audio requests")
+    parser.add_argument("--reads", type=int, default=500, help="requests for get-story / list / cached audio")
+    parser.add_argument("--exports", type=int, default=3, help="video exports (run concurrently)")
+    parser.add_argument("--audio-seconds", type=float, default=4.0, help="length of the stub TTS audio")
+    parser.add_argument("--db-sizes", type=int, nargs="*", default=[10_000, 100_000], help="stories for SQLite timings")
+    parser.add_argument("--db-reps", type=int, default=200, help="repetitions per SQLite operation")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    # Configure the app before it is imported (config is read from env at import time)
+    os.environ["STORYTELL_DB_DIR"] = tempfile.mkdtemp(prefix="storytale-bench-")
+    os.environ["POLLINATIONS_BASE"] = _start_fake_server(config_from_args(args))
+    for name, value in {
+        "STORYTELL_GEN_MAX_ACTIVE": str(max(args.concurrency, 1)),
+        "STORYTELL_GEN_MAX_PER_CLIENT": str(max(args.concurrency, 1)),
+        "STORYTELL_SCHED_CHAT_RPS": "0",
+        "STORYTELL_SCHED_IMAGE_RPS": "0",
+    }.items():
+        os.environ.setdefault(name, value)
+    install_fake_tts(_fake_mp3(args.audio_seconds), args.tts_latency)
+    print(f"data dir {os.environ['STORYTELL_DB_DIR']}, fake Pollinations at {os.environ['POLLINATIONS_BASE']}", file=sys.stderr)
+
+    # App logs ([StoryTale] ...) go to stderr so stdout is just the report
+    with contextlib.redirect_stdout(sys.stderr):
+        http_results = asyncio.run(bench_http(args))
+        rss_self, rss_child = _peak_rss_mb()
+        db_results = bench_sqlite(args.db_sizes, args.db_reps, args.episodes)
+
+    header = f"{'endpoint':>16} {'n':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    for result in http_results:
+        print(result.row())
+    print(f"\npeak RSS: {rss_self:.0f} MB (app + fake server), {rss_child:.0f} MB (largest child process)")
+
+    for size, results in db_results:
+        print(f"\nSQLite with {size} stories")
+        print(header.replace("endpoint", "operation"))
+        for result in results:
+            print(result.row())
+
+
+if __name__ == "__main__":
+    main()
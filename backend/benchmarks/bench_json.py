@@ -0,0 +1,107 @@
+"""Benchmark CPU time per GET /api/story/{id} response: FastAPI response_model path (before) vs
+FastJSONResponse (after), for 1/5/10-episode stories with blob image URLs and with legacy data URLs
+(base64 images inline, as older rows store them).
+
+The story dict is built like StoryRepository.get_story builds it and served from memory by two
+routes that differ only in how the response is produced; each request is a direct ASGI call (no HTTP
+client in the measurement).
+
+    cd backend
+    python -m benchmarks.bench_json [--requests 300] [--episodes 1 5 10] [--image-kb 150]
+"""
+import argparse
+import asyncio
+import base64
+import os
+import time
+
+from fastapi import FastAPI
+
+from app.models import EpisodeOut, GetStoryResponse
+from app.responses import FastJSONResponse, orjson
+
+
+def _story(n: int, legacy_kb: int) -> dict:
+    def url(i: int) -> str:
+        if legacy_kb:
+            return "data:image/jpeg;base64," + base64.b64encode(os.urandom(legacy_kb * 1024)).decode("ascii")
+        return f"/api/image/{os.urandom(32).hex()}"
+
+    return {
+        "storyId": "bench",
+        "topic": "a rabbit who learns to share",
+        "title": "กระต่ายน้อยกับการแบ่งปัน",
+        "num_episodes": n,
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "episodes": [
+            EpisodeOut(text="กระต่ายน้อยเดินเข้าไปในป่า แล้วพบเพื่อนใหม่ที่ใจดี " * 3, imageUrl=url(i))
+            for i in range(n)
+        ],
+    }
+
+
+def _app(story: dict) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/before", response_model=GetStoryResponse)
+    async def before():
+        return {**story, "episodes": list(story["episodes"])}
+
+    @app.get("/after", response_model=GetStoryResponse)
+    async def after():
+        return FastJSONResponse({**story, "episodes": list(story["episodes"])})
+
+    return app
+
+
+async def _get(app: FastAPI, path: str) -> int:
+    """One GET through the ASGI app (no HTTP client in the measurement); returns the body size."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    size = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal size
+        if message["type"] == "http.response.start" and message["status"] != 200:
+            raise RuntimeError(f"{path}: HTTP {message['status']}")
+        size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return size
+
+
+async def _cpu_per_request(app: FastAPI, path: str, requests: int) -> tuple[float, int]:
+    size = await _get(app, path)  # warm-up
+    t0 = time.process_time()
+    for _ in range(requests):
+        await _get(app, path)
+    return (time.process_time() - t0) / requests, size
+
+
+async def main_async(args) -> None:
+    print(f"serializer: {'orjson' if orjson is not None else 'stdlib json'}")
+    print(f"{'episodes':>8} {'images':>10} {'KB':>8} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+    for kind, kb in (("blob URL", 0), ("data URL", args.image_kb)):
+        for n in args.episodes:
+            app = _app(_story(n, kb))
+            before, size = await _cpu_per_request(app, "/before", args.requests)
+            after, _ = await _cpu_per_request(app, "/after", args.requests)
+            print(f"{n:>8} {kind:>10} {size / 1024:>8.0f} {before * 1000:>10.3f} {after * 1000:>9.3f} {before / after:>7.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300, help="requests per case")
+    parser.add_argument("--episodes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--image-kb", type=int, default=150, help="size of each inline image for the data URL cases")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
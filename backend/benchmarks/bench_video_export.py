@@ -0,0 +1,60 @@
+"""Benchmark video export encoders: direct ffmpeg slideshow vs moviepy, for 1/5/10-episode stories.
+
+Uses synthetic 1024x1024 JPEGs and sine-tone MP3s (no network, no TTS).
+
+    cd backend
+    python -m benchmarks.bench_video_export [--seconds 8] [--episodes 1 5 10]
+"""
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+
+from app.services.video_export import _ffmpeg_exe, _run_ffmpeg, encode_mp4_ffmpeg, encode_mp4_moviepy
+
+ENCODERS = {"ffmpeg": encode_mp4_ffmpeg, "moviepy": encode_mp4_moviepy}
+
+
+def _make_inputs(root: Path, n: int, seconds: float) -> list[tuple[str, str]]:
+    from PIL import Image, ImageDraw
+
+    ffmpeg = _ffmpeg_exe()
+    segments = []
+    for i in range(n):
+        img = Image.new("RGB", (1024, 1024), (200 - i * 10, 180, 140 + i * 10))
+        draw = ImageDraw.Draw(img)
+        for k in range(40):  # some detail so the encoder has real work to do
+            draw.ellipse((k * 25, (k * 37 + i * 50) % 900, k * 25 + 120, (k * 37 + i * 50) % 900 + 120), outline=(k * 6, 40, 90), width=6)
+        img_path = root / f"ep{i}.jpg"
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=90)
+        img_path.write_bytes(buf.getvalue())
+        audio_path = root / f"ep{i}.mp3"
+        _run_ffmpeg(ffmpeg, ["-f", "lavfi", "-i", f"sine=frequency={300 + i * 40}:duration={seconds}", "-q:a", "5", str(audio_path)])
+        segments.append((str(img_path), str(audio_path)))
+    return segments
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=8.0, help="narration length per episode")
+    parser.add_argument("--episodes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--encoders", nargs="+", default=list(ENCODERS), choices=list(ENCODERS))
+    args = parser.parse_args()
+
+    print(f"{'episodes':>8} {'encoder':>8} {'wall s':>8} {'size KB':>9}")
+    for n in args.episodes:
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            segments = _make_inputs(root, n, args.seconds)
+            for name in args.encoders:
+                out = root / f"{name}.mp4"
+                t0 = time.perf_counter()
+                ENCODERS[name](segments, str(out))
+                wall = time.perf_counter() - t0
+                print(f"{n:>8} {name:>8} {wall:>8.2f} {out.stat().st_size / 1024:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Local stand-in for Pollinations (chat completions + image) and Edge TTS, for benchmarks.
+
+Latencies are drawn from a distribution spec: "const:0.2", "uniform:0.1,0.5" or "lognormal:<median>,<sigma>"
+(seconds). A share of requests fails with 500 (error_rate) or 429 + Retry-After (throttle_rate).
+Images are real JPEGs of image_px x image_px, made unique per request so content-addressed storage
+does not dedupe them.
+
+Standalone (point a running backend at it with POLLINATIONS_BASE=http://127.0.0.1:9100):
+
+    cd backend
+    python -m benchmarks.fake_pollinations --port 9100 --chat-latency lognormal:2,0.4
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import re
+import sys
+import types
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+
+def parse_dist(spec: str) -> Callable[[], float]:
+    """Latency sampler from "const:x", "uniform:a,b" or "lognormal:median,sigma" (seconds)."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    if kind == "const" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0]) if values[0] > 0 else 0.0
+        return lambda: random.lognormvariate(mu, values[1]) if values[0] > 0 else 0.0
+    raise ValueError(f"bad latency spec {spec!r} (const:x | uniform:a,b | lognormal:median,sigma)")
+
+
+@dataclass
+class FakeConfig:
+    chat_latency: str = "lognormal:1.0,0.4"
+    image_latency: str = "lognormal:1.5,0.5"
+    tts_latency: str = "lognormal:0.3,0.3"
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    image_px: int = 1024
+
+
+def _jpeg_pool(px: int, n: int = 8) -> list[bytes]:
+    from PIL import Image
+
+    pool = []
+    for k in range(n):
+        img = Image.effect_noise((px, px), 40 + k * 5).convert("RGB")
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=85)
+        pool.append(buf.getvalue())
+    return pool
+
+
+def _story_doc(topic: str, n: int) -> str:
+    return json.dumps({
+        "title": f"The tale of {topic}",
+        "characterDescription": "a small brown rabbit with white belly and pink ears",
+        "artStyle": "soft watercolor painting, pastel colors",
+        "episodes": [
+            {
+                "text": f"Episode {i + 1}. The rabbit walks through the forest and finds something new about {topic}. "
+                        "Everyone smiles and learns to share.",
+                "imagePrompt": f"rabbit in a sunny forest, scene {i + 1}, {random.randint(0, 10**9)}",
+            }
+            for i in range(n)
+        ],
+    })
+
+
+def create_app(cfg: FakeConfig) -> FastAPI:
+    chat_latency = parse_dist(cfg.chat_latency)
+    image_latency = parse_dist(cfg.image_latency)
+    images = _jpeg_pool(cfg.image_px)
+    app = FastAPI()
+
+    def _failure() -> Response | None:
+        roll = random.random()
+        if roll < cfg.throttle_rate:
+            return JSONResponse({"error": "rate limited"}, status_code=429, headers={"Retry-After": "1"})
+        if roll < cfg.throttle_rate + cfg.error_rate:
+            return JSONResponse({"error": "upstream failure"}, status_code=500)
+        return None
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        body = await request.json()
+        latency = chat_latency()
+        failed = _failure()
+        if failed is not None:
+            await asyncio.sleep(latency * 0.1)
+            return failed
+        user = body["messages"][-1]["content"]
+        m = re.search(r"exactly (\d+) episodes", user)
+        doc = _story_doc(user[:40], int(m.group(1)) if m else 5)
+        if not body.get("stream"):
+            await asyncio.sleep(latency)
+            return {"choices": [{"message": {"content": doc}}]}
+
+        async def sse():
+            # ~20% time to first token, the rest spread over the tokens
+            await asyncio.sleep(latency * 0.2)
+            pieces = [doc[i:i + 40] for i in range(0, len(doc), 40)]
+            for piece in pieces:
+                await asyncio.sleep(latency * 0.8 / len(pieces))
+                yield f"data: {json.dumps({'choices': [{'delta': {'content': piece}}]})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    @app.get("/image/{prompt:path}")
+    async def image(prompt: str):
+        await asyncio.sleep(image_latency())
+        failed = _failure()
+        if failed is not None:
+            return failed
+        # Bytes after the JPEG end marker are ignored by decoders but make every image distinct
+        return Response(random.choice(images) + os.urandom(16), media_type="image/jpeg")
+
+    return app
+
+
+def install_fake_tts(mp3: bytes, latency: str = "const:0") -> None:
+    """Replace edge_tts.Communicate with a stub streaming `mp3` after a sampled delay
+    (registers a stub edge_tts module if the package is not installed)."""
+    sample = parse_dist(latency)
+
+    class FakeCommunicate:
+        def __init__(self, text: str, voice: str, **kwargs):
+            self.text = text
+
+        async def stream(self):
+            await asyncio.sleep(sample())
+            for i in range(0, len(mp3), 16 * 1024):
+                yield {"type": "audio", "data": mp3[i:i + 16 * 1024]}
+
+    try:
+        import edge_tts
+    except ImportError:
+        edge_tts = sys.modules["edge_tts"] = types.ModuleType("edge_tts")
+    edge_tts.Communicate = FakeCommunicate
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = FakeConfig()
+    parser.add_argument("--chat-latency", default=defaults.chat_latency, help="story completion latency spec")
+    parser.add_argument("--image-latency", default=defaults.image_latency, help="image latency spec")
+    parser.add_argument("--tts-latency", default=defaults.tts_latency, help="TTS latency spec (stubbed edge_tts)")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of 500 responses")
+    parser.add_argument("--throttle-rate", type=float, default=defaults.throttle_rate, help="share of 429 responses")
+    parser.add_argument("--image-px", type=int, default=defaults.image_px, help="image width/height")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    return FakeConfig(
+        chat_latency=args.chat_latency,
+        image_latency=args.image_latency,
+        tts_latency=args.tts_latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        image_px=args.image_px,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    add_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
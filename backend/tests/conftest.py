@@ -0,0 +1,5 @@
+"""Shared test setup: app config is read from env at import time, so point the data dir at a temp dir first."""
+import os
+import tempfile
+
+os.environ.setdefault("STORYTELL_DB_DIR", tempfile.mkdtemp(prefix="storytale-test-"))
@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from app.services import admission as admission_module
+from app.services.admission import AdmissionController, AdmissionRejected, client_key
+
+
+async def _spin() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_admits_then_queues_fifo():
+    ctl = AdmissionController(max_active=1, max_per_client=5, max_queue=5, queue_timeout=5)
+    first = await ctl.acquire("a")
+    waiters = [asyncio.create_task(ctl.acquire(c)) for c in ("b", "c")]
+    await _spin()
+    assert ctl.stats()["active"] == 1 and ctl.stats()["queued"] == 2
+    first.release()
+    second = await asyncio.wait_for(waiters[0], 1)
+    assert not waiters[1].done()
+    second.release()
+    third = await asyncio.wait_for(waiters[1], 1)
+    third.release()
+    assert ctl.stats()["active"] == 0 and ctl._per_client == {}
+
+
+async def test_per_client_limit_counts_queued_requests():
+    ctl = AdmissionController(max_active=1, max_per_client=2, max_queue=5, queue_timeout=5)
+    ticket = await ctl.acquire("a")
+    queued = asyncio.create_task(ctl.acquire("a"))
+    await _spin()
+    with pytest.raises(AdmissionRejected) as exc:
+        await ctl.acquire("a")
+    assert exc.value.status_code == 429 and exc.value.retry_after >= 1
+    ticket.release()
+    (await queued).release()
+
+
+async def test_full_queue_rejects_with_retry_after():
+    ctl = AdmissionController(max_active=1, max_per_client=5, max_queue=1, queue_timeout=5)
+    ticket = await ctl.acquire("a")
+    queued = asyncio.create_task(ctl.acquire("b"))
+    await _spin()
+    with pytest.raises(AdmissionRejected) as exc:
+        await ctl.acquire("c")
+    assert exc.value.status_code == 503
+    assert exc.value.retry_after == 60  # (1 queued + 1) / 1 active * 30s default estimate
+    assert ctl.stats()["rejected"] == 1
+    ticket.release()
+    (await queued).release()
+
+
+async def test_queue_timeout_and_cancellation_leave_no_counts():
+    ctl = AdmissionController(max_active=1, max_per_client=5, max_queue=5, queue_timeout=0.05)
+    ticket = await ctl.acquire("a")
+    with pytest.raises(AdmissionRejected) as exc:
+        await ctl.acquire("b")
+    assert exc.value.status_code == 503
+
+    cancelled = asyncio.create_task(ctl.acquire("c"))
+    await _spin()
+    cancelled.cancel()
+    await asyncio.gather(cancelled, return_exceptions=True)
+    assert ctl.stats()["queued"] == 0 and ctl._per_client == {"a": 1}
+
+    ticket.release()
+    ticket.release()  # idempotent
+    assert ctl.stats()["active"] == 0 and ctl._per_client == {}
+
+
+async def test_slot_handed_to_cancelled_waiter_is_passed_on():
+    ctl = AdmissionController(max_active=1, max_per_client=5, max_queue=5, queue_timeout=5)
+    ticket = await ctl.acquire("a")
+    first = asyncio.create_task(ctl.acquire("b"))
+    second = asyncio.create_task(ctl.acquire("c"))
+    await _spin()
+    ticket.release()  # hands the slot to `first`...
+    first.cancel()  # ...which gives up before it runs
+    (outcome,) = await asyncio.gather(first, return_exceptions=True)
+    if not isinstance(outcome, BaseException):
+        # wait_for may swallow a cancellation that races with the result: then `first` owns the slot
+        outcome.release()
+    (await asyncio.wait_for(second, 1)).release()
+    assert ctl.stats()["active"] == 0 and ctl._per_client == {}
+
+
+def _request(headers: dict, host: str = "10.0.0.1") -> Request:
+    raw = [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "headers": raw, "client": (host, 1234)})
+
+
+def test_client_key_trusts_forwarded_for_only_when_configured(monkeypatch):
+    request = _request({"X-Forwarded-For": "203.0.113.9, 10.0.0.2"})
+    monkeypatch.setattr(admission_module, "TRUST_FORWARDED_FOR", False)
+    assert client_key(request) == "10.0.0.1"
+    monkeypatch.setattr(admission_module, "TRUST_FORWARDED_FOR", True)
+    assert client_key(request) == "203.0.113.9"
+    assert client_key(_request({})) == "10.0.0.1"
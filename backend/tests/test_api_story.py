@@ -0,0 +1,58 @@
+from fastapi.testclient import TestClient
+
+from app.db import init_db
+from app.main import STORY_REPRESENTATION_VERSION, app, repo
+from app.db.repository import story_cache
+
+
+def _etag(story_id: str) -> str:
+    return f'"story-{story_id}-v{STORY_REPRESENTATION_VERSION}"'
+
+
+def test_story_etag_304_only_for_existing_story():
+    init_db()
+    story_id = repo.new_id()
+    repo.save_story(story_id, "topic", "Title", 1, [("text", None, "prompt")])
+    client = TestClient(app)
+
+    r = client.get(f"/api/story/{story_id}")
+    assert r.status_code == 200 and r.headers["etag"] == _etag(story_id)
+
+    story_cache.clear()  # existence from SQLite as well as from the cache
+    for _ in range(2):
+        r = client.get(f"/api/story/{story_id}", headers={"If-None-Match": _etag(story_id)})
+        assert r.status_code == 304
+        client.get(f"/api/story/{story_id}")
+
+    unknown = repo.new_id()
+    r = client.get(f"/api/story/{unknown}", headers={"If-None-Match": _etag(unknown)})
+    assert r.status_code == 404
+
+
+def test_image_etag_304_only_for_stored_image():
+    init_db()
+    image_hash = repo.put_image(b"\x89PNG\r\n\x1a\n" + repo.new_id().encode())
+    client = TestClient(app)
+
+    r = client.get(f"/api/image/{image_hash}")
+    assert r.status_code == 200
+    r = client.get(f"/api/image/{image_hash}", headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+    unknown = "0" * 64
+    r = client.get(f"/api/image/{unknown}", headers={"If-None-Match": f'"{unknown}"'})
+    assert r.status_code == 404
+
+
+def test_list_stories_validates_paging():
+    init_db()
+    client = TestClient(app)
+    for params in ({"limit": -1}, {"limit": 0}, {"limit": 101}, {"offset": -1}):
+        assert client.get("/api/stories", params=params).status_code == 422
+    assert client.get("/api/stories", params={"limit": 100}).status_code == 200
+
+
+def test_batch_items_status_filter_is_validated():
+    client = TestClient(app)
+    assert client.get("/api/story/batch/missing/items", params={"status": "donee"}).status_code == 422
+    assert client.get("/api/story/batch/missing/items", params={"status": "done"}).status_code == 404
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from app.services import audio_cache as audio_cache_module
+from app.services.audio_cache import AudioCache
+
+CHUNKS = [b"ID3", b"chunk-1", b"chunk-2", b"chunk-3"]
+
+
+@pytest.fixture
+def tts(monkeypatch):
+    """Fake Edge TTS: counts syntheses, yields CHUNKS with a small delay; set fail=True to break it."""
+    state = {"calls": 0, "fail": False}
+
+    async def stream_audio(text, voice):
+        state["calls"] += 1
+        for i, chunk in enumerate(CHUNKS):
+            await asyncio.sleep(0.01)
+            if state["fail"] and i == 2:
+                raise ConnectionError("edge tts dropped")
+            yield chunk
+
+    monkeypatch.setattr(audio_cache_module, "stream_audio", stream_audio)
+    return state
+
+
+async def _read(stream) -> bytes:
+    return b"".join([chunk async for chunk in stream])
+
+
+async def test_concurrent_streamed_misses_share_one_synthesis(tmp_path, tts):
+    cache = AudioCache(tmp_path, max_bytes=1024 * 1024)
+    # Like the endpoint: every request sees a miss, then builds its response from stream()
+    streams = []
+    for _ in range(5):
+        assert await cache.lookup("hello") is None
+        streams.append(cache.stream("hello"))
+    bodies = await asyncio.gather(*(_read(s) for s in streams))
+    assert bodies == [b"".join(CHUNKS)] * 5
+    assert tts["calls"] == 1
+    path, _ = await cache.lookup("hello")
+    assert path.read_bytes() == b"".join(CHUNKS)
+    assert cache.store._total == len(b"".join(CHUNKS))
+
+
+async def test_late_joiner_gets_the_full_audio(tmp_path, tts):
+    cache = AudioCache(tmp_path, max_bytes=1024 * 1024)
+    first = cache.stream("hello")
+    assert await first.__anext__() == CHUNKS[0]
+    await asyncio.sleep(0.025)  # synthesis is part-way through
+    late, rest = await asyncio.gather(_read(cache.stream("hello")), _read(first))
+    assert late == b"".join(CHUNKS)
+    assert CHUNKS[0] + rest == b"".join(CHUNKS)
+    assert tts["calls"] == 1
+
+
+async def test_get_joins_streamed_miss(tmp_path, tts):
+    cache = AudioCache(tmp_path, max_bytes=1024 * 1024)
+    stream = cache.stream("hello")
+    (path, _), body = await asyncio.gather(cache.get("hello"), _read(stream))
+    assert path.read_bytes() == body == b"".join(CHUNKS)
+    assert tts["calls"] == 1
+
+
+async def test_disconnected_reader_still_caches(tmp_path, tts):
+    cache = AudioCache(tmp_path, max_bytes=1024 * 1024)
+    stream = cache.stream("hello")
+    await stream.__anext__()
+    await stream.aclose()  # client went away
+    path, _ = await cache.get("hello")
+    assert path.read_bytes() == b"".join(CHUNKS)
+    assert tts["calls"] == 1
+
+
+async def test_failed_synthesis_is_not_cached_and_retried(tmp_path, tts):
+    cache = AudioCache(tmp_path, max_bytes=1024 * 1024)
+    tts["fail"] = True
+    results = await asyncio.gather(_read(cache.stream("hello")), cache.get("hello"), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert tts["calls"] == 1
+    assert await cache.lookup("hello") is None
+    assert list((tmp_path / "tmp").iterdir()) == []
+
+    tts["fail"] = False
+    path, _ = await cache.get("hello")
+    assert path.read_bytes() == b"".join(CHUNKS)
+    assert tts["calls"] == 2
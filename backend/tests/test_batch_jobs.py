@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+from app.models import GenerateStoryRequest
+from app.services.batch_jobs import BatchManager
+
+
+class FakeService:
+    """generate_events(save=False) without upstream calls; topic "slow" never finishes."""
+
+    async def generate_events(self, topic, num_episodes, story_lang, image_model, image_style, seed=None, save=True):
+        assert save is False
+        story_id = f"id-{topic}"
+        yield {"event": "story", "storyId": story_id, "title": topic.title(), "num_episodes": num_episodes}
+        if topic == "slow":
+            await asyncio.sleep(60)
+        for i in range(num_episodes):
+            yield {"event": "episode", "index": i, "text": "t", "imageUrl": ""}
+        yield {"event": "ready", "story": {"story_id": story_id, "topic": topic, "title": topic, "num_episodes": num_episodes, "episodes": []}}
+
+
+class GatedRepo:
+    """save_stories blocks (in its worker thread) until `release` is set."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.saved: list[list[str]] = []
+
+    def save_stories(self, records):
+        self.started.set()
+        assert self.release.wait(5)
+        self.saved.append([r["story_id"] for r in records])
+
+
+def _manager(repo) -> BatchManager:
+    return BatchManager(FakeService(), repo, workers=2, rate_per_min=0, flush_size=10, flush_seconds=0.05)
+
+
+async def _until(predicate, timeout: float = 2.0) -> None:
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.005)
+    await asyncio.wait_for(poll(), timeout)
+
+
+async def test_story_id_published_only_after_save():
+    repo = GatedRepo()
+    manager = _manager(repo)
+    job = manager.submit([GenerateStoryRequest(topic="fox", num_episodes=2)])
+    item = job.items[0]
+    await _until(repo.started.is_set)
+    assert item.status == "saving" and item.title == "Fox"
+    assert item.story_id is None  # not in SQLite yet: GET /api/story/{id} would 404
+    repo.release.set()
+    await _until(lambda: item.status == "done")
+    assert item.story_id == "id-fox" and job.status == "done" and job.progress == 1.0
+    await manager.shutdown()
+
+
+async def test_shutdown_waits_for_write_in_progress():
+    repo = GatedRepo()
+    manager = _manager(repo)
+    job = manager.submit([GenerateStoryRequest(topic=t, num_episodes=1) for t in ("a", "b", "slow")])
+    await _until(repo.started.is_set)
+    threading.Timer(0.1, repo.release.set).start()  # transaction still running when shutdown starts
+    await manager.shutdown()
+
+    done = {item.request.topic: item for item in job.items}
+    assert sorted(sum(repo.saved, [])) == ["id-a", "id-b"]
+    assert done["a"].status == done["b"].status == "done"
+    assert done["a"].story_id == "id-a"
+    assert done["slow"].status == "failed" and done["slow"].story_id is None
+    assert job.status == "done" and manager.stats()["saving"] == 0
+
+
+async def test_failed_write_marks_items_failed():
+    class BrokenRepo:
+        def save_stories(self, records):
+            raise RuntimeError("disk full")
+
+    manager = _manager(BrokenRepo())
+    job = manager.submit([GenerateStoryRequest(topic="x", num_episodes=1)])
+    await _until(lambda: job.status == "done")
+    assert job.items[0].status == "failed" and job.items[0].error == "Save failed"
+    assert job.items[0].story_id is None
+    await manager.shutdown()
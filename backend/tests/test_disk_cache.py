@@ -0,0 +1,69 @@
+import os
+import time
+
+from app.metrics import CACHE_EVICTIONS
+from app.services.disk_cache import DiskLRU
+
+
+def _put(cache: DiskLRU, key: str, size: int) -> None:
+    tmp = cache.temp_path(key)
+    tmp.write_bytes(b"x" * size)
+    cache.commit(tmp, key)
+
+
+def _on_disk(cache: DiskLRU) -> int:
+    return sum(p.stat().st_size for p in cache._entries())
+
+
+def test_total_tracks_replaced_key(tmp_path):
+    cache = DiskLRU(tmp_path, max_bytes=10_000, suffix=".bin")
+    _put(cache, "other", 1000)
+    for _ in range(120):
+        _put(cache, "same", 100)
+    assert cache._total == _on_disk(cache) == 1100
+    _put(cache, "third", 100)
+    assert cache.lookup("other") is not None  # nothing needed evicting
+
+
+def test_replacing_with_different_size(tmp_path):
+    cache = DiskLRU(tmp_path, max_bytes=10_000, suffix=".bin")
+    _put(cache, "a", 500)
+    _put(cache, "a", 200)
+    _put(cache, "a", 900)
+    assert cache._total == _on_disk(cache) == 900
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskLRU(tmp_path, max_bytes=300, suffix=".bin")
+    for i, key in enumerate(("a", "b", "c")):
+        _put(cache, key, 100)
+        os.utime(cache.path(key), (time.time() - 100 + i, time.time() - 100 + i))
+    cache.lookup("a")  # now most recently used
+    _put(cache, "d", 100)
+    assert cache.lookup("b") is None
+    assert all(cache.lookup(k) is not None for k in ("a", "c", "d"))
+    assert cache._total == _on_disk(cache) == 300
+
+
+def test_new_entry_is_never_evicted(tmp_path):
+    cache = DiskLRU(tmp_path, max_bytes=100, suffix=".bin")
+    _put(cache, "a", 50)
+    _put(cache, "big", 500)
+    assert cache.lookup("a") is None
+    assert cache.lookup("big") is not None
+
+
+def test_total_scanned_from_existing_files(tmp_path):
+    (tmp_path / "old.bin").write_bytes(b"x" * 250)
+    cache = DiskLRU(tmp_path, max_bytes=10_000, suffix=".bin")
+    _put(cache, "new", 50)
+    assert cache._total == 300
+    assert not any(p.is_file() for p in (tmp_path / "tmp").iterdir())  # temp file was moved, not copied
+
+
+def test_evictions_are_counted(tmp_path):
+    cache = DiskLRU(tmp_path, max_bytes=250, suffix=".bin", name="test_disk")
+    before = CACHE_EVICTIONS._values.get(("test_disk",), 0)
+    for key in ("a", "b", "c", "d"):
+        _put(cache, key, 100)
+    assert CACHE_EVICTIONS._values[("test_disk",)] - before == 2
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from app.services.json_stream import StoryJsonStream
+
+STORY = {
+    "title": 'ลูกหมา "ตัวน้อย" {กับ} [เพื่อน]',
+    "characterDescription": "a small puppy with a red collar \\ and a blue scarf",
+    "artStyle": "soft watercolor, pastel colors",
+    "episodes": [
+        {"text": "Once upon a time… {braces} and \"quotes\"", "imagePrompt": "in a sunny park"},
+        {"text": "ตอนที่สอง", "imagePrompt": "at home", "extra": {"nested": [1, 2]}},
+        {"text": "The end.", "imagePrompt": "under the stars"},
+    ],
+    "moral": {"lesson": "share"},
+    "pages": 3,
+    "final": True,
+}
+EXPECTED = [
+    ("title", STORY["title"]),
+    ("characterDescription", STORY["characterDescription"]),
+    ("artStyle", STORY["artStyle"]),
+    ("episode", (0, STORY["episodes"][0])),
+    ("episode", (1, STORY["episodes"][1])),
+    ("episode", (2, STORY["episodes"][2])),
+    ("episodes", STORY["episodes"]),
+    ("moral", STORY["moral"]),
+    ("pages", 3),
+    ("final", True),
+]
+DOC = "```json\n" + json.dumps(STORY, ensure_ascii=False, indent=2) + "\n```\nHope you like it {!}"
+
+
+def _feed(doc: str, size: int) -> list:
+    parser = StoryJsonStream()
+    out = []
+    for i in range(0, len(doc), size):
+        out.extend(parser.feed(doc[i:i + size]))
+    assert parser.done
+    return out
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 64, len(DOC)])
+def test_same_output_for_any_chunking(size):
+    assert _feed(DOC, size) == EXPECTED
+
+
+def test_compact_json_and_trailing_scalar():
+    doc = json.dumps({"title": "T", "episodes": [{"text": "a"}], "n": 5}, separators=(",", ":"))
+    assert _feed(doc, 1) == [("title", "T"), ("episode", (0, {"text": "a"})), ("episodes", [{"text": "a"}]), ("n", 5)]
+
+
+def test_fields_arrive_before_the_document_is_complete():
+    parser = StoryJsonStream()
+    head = DOC[:DOC.index('"imagePrompt": "at home"')]
+    out = parser.feed(head)
+    assert [kind for kind, _ in out] == ["title", "characterDescription", "artStyle", "episode"]
+    assert not parser.done
+
+
+def test_malformed_episode_is_skipped_but_counted():
+    doc = '{"episodes": [{"text": "ok"}, {"text": oops}, {"text": "last"}]}'
+    episodes = [value for kind, value in _feed(doc, 5) if kind == "episode"]
+    assert episodes == [(0, {"text": "ok"}), (2, {"text": "last"})]
+
+
+def test_text_after_the_object_is_ignored():
+    parser = StoryJsonStream()
+    assert parser.feed('{"title": "A"} {"title": "B"}') == [("title", "A")]
+    assert parser.feed('{"title": "C"}') == []
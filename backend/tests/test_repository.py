@@ -0,0 +1,77 @@
+import base64
+import io
+import uuid
+
+import pytest
+from PIL import Image
+
+from app.db import StoryRepository, init_db
+from app.db.repository import IMAGE_URL_PREFIX
+
+
+@pytest.fixture
+def repo() -> StoryRepository:
+    init_db()
+    return StoryRepository()
+
+
+def _jpeg() -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 120, 40)).save(out, "JPEG")
+    return out.getvalue()
+
+
+def _insert_legacy_story(repo: StoryRepository, data_url: str) -> str:
+    """A story as saved before image blobs: data URL in episodes.image_url, no hash, no thumbnail."""
+    story_id = str(uuid.uuid4())
+    with repo._conn() as conn:
+        conn.execute(
+            "INSERT INTO stories (id, topic, title, num_episodes, created_at) VALUES (?, 'legacy', 'Old', 2, '2024-01-01T00:00:00+00:00')",
+            (story_id,),
+        )
+        conn.executemany(
+            "INSERT INTO episodes (story_id, ordinal, text, image_url) VALUES (?, ?, ?, ?)",
+            [(story_id, 0, "one", data_url), (story_id, 1, "two", data_url)],
+        )
+    return story_id
+
+
+def _listed(repo: StoryRepository, story_id: str) -> dict:
+    return next(s for s in repo.list_stories(limit=1000) if s["storyId"] == story_id)
+
+
+def test_list_never_inlines_data_urls(repo):
+    story_id = _insert_legacy_story(repo, "data:image/jpeg;base64," + base64.b64encode(_jpeg()).decode())
+    assert _listed(repo, story_id)["first_episode_image_url"] is None
+
+
+def test_backfill_moves_legacy_images_to_blobs(repo):
+    repo._conn().execute("PRAGMA user_version = 0")  # as a database from before the upgrade
+    data = _jpeg()
+    story_id = _insert_legacy_story(repo, "data:image/jpeg;base64," + base64.b64encode(data).decode())
+    broken_id = _insert_legacy_story(repo, "data:image/jpeg;base64")
+
+    moved, thumbnails = repo.backfill_legacy_images()
+    assert moved >= 4 and thumbnails >= 1
+
+    listed = _listed(repo, story_id)
+    assert listed["first_episode_image_url"] == IMAGE_URL_PREFIX + repo.image_key(data)
+    assert listed["thumbnail_url"].startswith(IMAGE_URL_PREFIX)
+    episodes = repo.get_story(story_id)["episodes"]
+    assert [ep.imageUrl for ep in episodes] == [IMAGE_URL_PREFIX + repo.image_key(data)] * 2
+    assert repo.get_image(repo.image_key(data))[0] == data
+
+    broken = _listed(repo, broken_id)
+    assert broken["first_episode_image_url"] is None and broken["thumbnail_url"] is None
+
+    assert repo.backfill_legacy_images() == (0, 0)
+
+
+def test_backfill_runs_once(repo):
+    repo._conn().execute("PRAGMA user_version = 0")
+    repo.backfill_legacy_images()
+    data_url = "data:image/jpeg;base64," + base64.b64encode(_jpeg()).decode()
+    story_id = _insert_legacy_story(repo, data_url)
+    assert repo.backfill_legacy_images() == (0, 0)  # no second scan
+    row = repo._conn().execute("SELECT image_url FROM episodes WHERE story_id = ? LIMIT 1", (story_id,)).fetchone()
+    assert row[0] == data_url
@@ -0,0 +1,202 @@
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+
+import httpx
+import pytest
+
+from app.services import resilience
+from app.services.resilience import CircuitBreaker, CircuitOpenError, call_with_resilience
+
+
+def _response(status: int, headers: dict | None = None) -> httpx.Response:
+    return httpx.Response(status, headers=headers, request=httpx.Request("GET", "http://upstream/"))
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "_latencies", {})
+    events: list[tuple[str, str, dict]] = []
+    monkeypatch.setattr(resilience, "_listeners", [lambda event, endpoint, info: events.append((event, endpoint, info))])
+    return events
+
+
+def _open_breaker(endpoint: str) -> CircuitBreaker:
+    cb = resilience._breakers[endpoint] = CircuitBreaker(endpoint, threshold=1, reset_after=0)
+    cb.record_failure()
+    assert cb.state == "open"
+    return cb
+
+
+def test_breaker_transitions():
+    cb = CircuitBreaker("t", threshold=2, reset_after=60)
+    cb.record_failure()
+    assert cb.state == "closed" and cb.allow()
+    cb.record_failure()
+    assert cb.state == "open" and not cb.allow()
+
+    cb.reset_after = 0
+    assert cb.allow()  # the one half-open trial
+    assert cb.state == "half_open"
+    assert not cb.allow()  # no second trial while it runs
+    cb.record_failure()
+    assert cb.state == "open"
+
+    assert cb.allow()
+    cb.record_success()
+    assert cb.state == "closed" and cb.allow()
+
+
+async def test_cancelled_half_open_trial_is_released():
+    cb = _open_breaker("cancel")
+
+    async def send():
+        await asyncio.sleep(60)
+
+    task = asyncio.create_task(call_with_resilience("cancel", send, max_retries=0))
+    await asyncio.sleep(0.01)
+    assert cb.state == "half_open" and cb._trial_in_flight
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert not cb._trial_in_flight
+    assert (await call_with_resilience("cancel", lambda: _ok())).status_code == 200
+    assert cb.state == "closed"
+
+
+async def _ok() -> httpx.Response:
+    return _response(200)
+
+
+async def test_unexpected_error_counts_as_failure():
+    cb = _open_breaker("boom")
+
+    async def send():
+        raise ValueError("bad payload")
+
+    with pytest.raises(ValueError):
+        await call_with_resilience("boom", send, max_retries=0)
+    assert cb.state == "open"
+
+
+async def test_throttled_half_open_trial_is_released():
+    cb = _open_breaker("quota")
+
+    async def send():
+        return _response(429)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await call_with_resilience("quota", send, max_retries=0)
+    assert cb.state == "half_open" and not cb._trial_in_flight
+    assert cb.allow()
+
+
+async def test_open_circuit_rejects_without_calling():
+    cb = _open_breaker("down")
+    cb.reset_after = 60
+    calls = []
+
+    async def send():
+        calls.append(1)
+        return _response(200)
+
+    with pytest.raises(CircuitOpenError):
+        await call_with_resilience("down", send)
+    assert calls == []
+
+
+async def test_retry_honors_retry_after(fresh_state):
+    responses = [_response(503, {"Retry-After": "0"}), _response(200)]
+
+    async def send():
+        return responses.pop(0)
+
+    assert (await call_with_resilience("retry", send, max_retries=1)).status_code == 200
+    retries = [info for event, _, info in fresh_state if event == "retry"]
+    assert retries == [{"attempt": 1, "delay": 0.0, "reason": "HTTP 503"}]
+
+
+def test_retry_after_parsing():
+    assert resilience.retry_after_seconds(_response(429, {"Retry-After": "7"})) == 7.0
+    assert resilience.retry_after_seconds(_response(429, {"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert resilience.retry_after_seconds(_response(429, {"Retry-After": "soon"})) is None
+    assert resilience.retry_after_seconds(_response(429)) is None
+
+
+def _prime_latency(endpoint: str, seconds: float) -> None:
+    for _ in range(20):
+        resilience._latency(endpoint).add(seconds)
+
+
+async def test_hedge_duplicate_wins(monkeypatch, fresh_state):
+    monkeypatch.setattr(resilience, "POLLINATIONS_HEDGE_MIN_DELAY", 0.01)
+    _prime_latency("hedge", 0.01)
+    first_cancelled = asyncio.Event()
+    calls = []
+
+    async def send():
+        calls.append(1)
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(60)
+            except asyncio.CancelledError:
+                first_cancelled.set()
+                raise
+        return _response(200)
+
+    assert (await call_with_resilience("hedge", send, hedge=True)).status_code == 200
+    await asyncio.wait_for(first_cancelled.wait(), 1)
+    assert [event for event, _, _ in fresh_state] == ["hedge", "hedge_won"]
+
+
+async def test_cancelled_caller_cancels_first_request():
+    _prime_latency("hedge-cancel", 0.01)  # hedge delay = POLLINATIONS_HEDGE_MIN_DELAY (seconds)
+    started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def send():
+        started.set()
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.create_task(call_with_resilience("hedge-cancel", send, hedge=True))
+    await started.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+async def test_slot_released_during_retry_backoff(monkeypatch):
+    monkeypatch.setattr(resilience, "_backoff", lambda attempt: 0.05)
+    held: list[bool] = []
+    in_slot = False
+
+    @asynccontextmanager
+    async def slot():
+        nonlocal in_slot
+        in_slot = True
+        try:
+            yield
+        finally:
+            in_slot = False
+
+    responses = [_response(503), _response(200)]
+
+    async def send():
+        return responses.pop(0)
+
+    async def watch():
+        while responses:
+            held.append(in_slot)
+            await asyncio.sleep(0.005)
+
+    watcher = asyncio.create_task(watch())
+    async with AsyncExitStack() as keep:
+        r = await call_with_resilience("slot", send, max_retries=1, slot=slot, keep_slot=keep)
+        assert r.status_code == 200 and in_slot  # kept for the caller (e.g. a streamed body)
+    assert not in_slot
+    await watcher
+    assert held and not any(held)  # nobody holds the slot while the retry waits
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services import scheduler as scheduler_module
+from app.services.scheduler import UpstreamScheduler, _AdaptiveBucket, _PriorityPool, upstream_priority
+
+INTERACTIVE, BACKGROUND = 0, 1
+
+
+async def _spin() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_waiters_are_served_by_priority_then_arrival():
+    pool = _PriorityPool(1)
+    await pool.acquire(INTERACTIVE)
+    order: list[str] = []
+
+    async def wait(name: str, priority: int) -> None:
+        await pool.acquire(priority)
+        order.append(name)
+
+    tasks = []
+    for name, priority in (("bg1", BACKGROUND), ("ui1", INTERACTIVE), ("bg2", BACKGROUND), ("ui2", INTERACTIVE)):
+        tasks.append(asyncio.create_task(wait(name, priority)))
+        await _spin()
+    assert pool.waiting == 4
+    for _ in range(4):
+        pool.release()
+        await _spin()
+    await asyncio.gather(*tasks)
+    assert order == ["ui1", "ui2", "bg1", "bg2"]
+    pool.release()
+    assert pool.active == 0
+
+
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    pool = _PriorityPool(1)
+    await pool.acquire(INTERACTIVE)
+    waiter = asyncio.create_task(pool.acquire(INTERACTIVE))
+    await _spin()
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    pool.release()
+    assert pool.active == 0 and pool.waiting == 0
+    await asyncio.wait_for(pool.acquire(INTERACTIVE), 1)
+    assert pool.active == 1
+
+
+async def test_slot_handed_to_cancelled_waiter_is_passed_on():
+    pool = _PriorityPool(1)
+    await pool.acquire(INTERACTIVE)
+    first = asyncio.create_task(pool.acquire(INTERACTIVE))
+    second = asyncio.create_task(pool.acquire(INTERACTIVE))
+    await _spin()
+    pool.release()  # handed to `first`...
+    first.cancel()  # ...which is cancelled before it runs
+    await asyncio.gather(first, return_exceptions=True)
+    await asyncio.wait_for(second, 1)
+    assert pool.active == 1 and pool.waiting == 0
+
+
+async def test_slot_uses_context_priority(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHED_CHAT_CONCURRENCY", 1)
+    monkeypatch.setattr(scheduler_module, "SCHED_CHAT_RPS", 0)
+    sched = UpstreamScheduler()
+    release = asyncio.Event()
+    order: list[str] = []
+
+    async def call(name: str) -> None:
+        async with sched.slot("chat"):
+            order.append(name)
+            await release.wait()
+
+    async def background(name: str) -> None:
+        with upstream_priority("background"):
+            await call(name)
+
+    holder = asyncio.create_task(call("holder"))
+    await _spin()
+    tasks = [asyncio.create_task(background("batch"))]
+    await _spin()
+    tasks.append(asyncio.create_task(call("user")))
+    await _spin()
+    assert sched.stats()["chat"] == {"active": 1, "waiting": 2, "rate": 0.0}
+    release.set()
+    await asyncio.gather(holder, *tasks)
+    assert order == ["holder", "user", "batch"]
+
+
+def test_bucket_aimd():
+    bucket = _AdaptiveBucket(rate=16, burst=4)
+    bucket.throttled()
+    assert bucket.rate == 8
+    for _ in range(10):
+        bucket.throttled()
+    assert bucket.rate == 1  # floor: max_rate / 16
+    bucket.succeeded()
+    assert bucket.rate == pytest.approx(1.8)  # + max_rate / 20
+    for _ in range(50):
+        bucket.succeeded()
+    assert bucket.rate == 16
+
+
+async def test_bucket_paces_after_burst():
+    bucket = _AdaptiveBucket(rate=50, burst=2)
+    start = time.monotonic()
+    for _ in range(2):
+        await bucket.take()
+    assert time.monotonic() - start < 0.01  # burst is free
+    for _ in range(3):
+        await bucket.take()
+    assert time.monotonic() - start >= 0.05  # 3 more tokens at 50/s
+
+
+async def test_after_attempt_adapts_and_reports(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "SCHED_IMAGE_RPS", 4)
+    events = []
+    monkeypatch.setattr(scheduler_module, "report_event", lambda event, endpoint, **info: events.append((event, endpoint, info)))
+    sched = UpstreamScheduler()
+    await sched.before_attempt("image:flux")
+    sched.after_attempt("image:flux", 429)
+    assert sched.stats()["image:flux"]["rate"] == 2
+    assert events == [("throttled", "image:flux", {"rate": 2})]
+    sched.after_attempt("image:flux", 200)
+    assert sched.stats()["image:flux"]["rate"] == pytest.approx(2.2)
+    sched.after_attempt("image:flux", 500)  # not a quota signal
+    assert sched.stats()["image:flux"]["rate"] == pytest.approx(2.2)
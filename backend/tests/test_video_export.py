@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from app.services import video_export
+from app.services.disk_cache import DiskLRU
+from app.services.video_export import build_story_video, segment_key
+
+
+STORY = {"storyId": "s1", "episodes": [{"text": "one", "imageUrl": ""}, {"text": "two", "imageUrl": ""}]}
+
+
+def _setup(monkeypatch, tmp_path):
+    cache = DiskLRU(tmp_path / "cache", max_bytes=10_000_000, suffix=".mp4", name="video")
+    monkeypatch.setattr(video_export, "video_cache", cache)
+    encoded = []
+
+    async def prepare(repo, index, text, image_url, work_dir):
+        return None, text
+
+    async def run_cpu(fn, *args):
+        if fn is video_export.encode_segment_ffmpeg:
+            _, text, out = args
+            encoded.append(text)
+            Path(out).write_text(f"<{text}>")
+        elif fn is video_export.concat_segments_ffmpeg:
+            seg_paths, out = args
+            for entry in cache._entries():  # everything evicted between the segment step and the concat
+                entry.unlink()
+            Path(out).write_text("".join(Path(p).read_text() for p in seg_paths))
+        else:
+            raise AssertionError(f"unexpected {fn}")
+
+    monkeypatch.setattr(video_export, "_prepare_episode", prepare)
+    return cache, encoded, run_cpu
+
+
+def _cache_segment(cache: DiskLRU, text: str) -> None:
+    tmp = cache.temp_path("x")
+    tmp.write_text(f"<{text}>")
+    cache.commit(tmp, segment_key(text, "", "ffmpeg"))
+
+
+async def test_evicted_segments_do_not_fall_back_to_moviepy(monkeypatch, tmp_path):
+    cache, encoded, run_cpu = _setup(monkeypatch, tmp_path)
+    _cache_segment(cache, "one")
+    _cache_segment(cache, "two")
+    lookup = cache.lookup
+
+    def lookup_then_evict(key):
+        path = lookup(key)
+        if key == segment_key("one", "", "ffmpeg") and path is not None:
+            path.unlink()  # evicted by another job right after our lookup
+        return path
+
+    monkeypatch.setattr(cache, "lookup", lookup_then_evict)
+    work = tmp_path / "work"
+    work.mkdir()
+    out = await build_story_video(STORY, work, run_cpu, repo=object(), encoder="ffmpeg")
+    assert out.read_text() == "<one><two>"
+    assert encoded == ["one"]  # only the segment that was gone is encoded again
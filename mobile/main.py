@@ -57,6 +57,16 @@ IMAGE_STYLE_VALUES = [
 ]
 
 
+def _abs_url(url, width=None):
+    """Backend returns relative image URLs (/api/image/...) – prefix API_BASE for AsyncImage.
+    width: ask for a resized variant (server picks the nearest standard width)."""
+    if url and url.startswith("/"):
+        if width and url.startswith("/api/image/"):
+            url = f"{url}?w={width}"
+        return f"{API_BASE}{url}"
+    return url
+
+
 Builder.load_string("""
 #:set primary_color 0.91, 0.71, 0.72, 1
 #:set secondary_color 0.66, 0.84, 0.73, 1
@@ -339,21 +349,46 @@ class HomeScreen(Screen):
 
 
 class StoryListScreen(Screen):
+    PAGE_SIZE = 20
+
     def on_enter(self, *args):
         super().on_enter(*args)
         self._load_list()
 
+    def on_kv_post(self, base_widget):
+        super().on_kv_post(base_widget)
+        self.ids.scroll.bind(scroll_y=self._on_scroll)
+
     def _load_list(self):
         container = self.ids.list_container
         container.clear_widgets()
-        url = f"{API_BASE}/api/stories"
+        container.height = 0
+        self._count = 0
+        self._next_cursor = None
+        self._loading = False
+        self._request_page(None)
+
+    def _request_page(self, cursor):
+        # Keyset pagination: backend returns the next page's cursor in X-Next-Cursor
+        self._loading = True
+        url = f"{API_BASE}/api/stories?limit={self.PAGE_SIZE}"
+        if cursor:
+            url += f"&cursor={cursor}"
         UrlRequest(
             url,
             on_success=self._on_list_success,
-            on_failure=lambda req, res: None,
-            on_error=lambda req, err: None,
+            on_failure=self._on_list_done,
+            on_error=self._on_list_done,
         )
 
+    def _on_list_done(self, req, result):
+        self._loading = False
+
+    def _on_scroll(self, scroll, value):
+        # infinite scroll: fetch next page when near the bottom
+        if value <= 0.05 and self._next_cursor and not self._loading:
+            self._request_page(self._next_cursor)
+
     def _format_date(self, iso_str):
         try:
             from datetime import datetime
@@ -364,14 +399,16 @@ class StoryListScreen(Screen):
 
     @mainthread
     def _on_list_success(self, req, result):
+        self._loading = False
+        headers = {k.lower(): v for k, v in (req.resp_headers or {}).items()}
+        self._next_cursor = headers.get("x-next-cursor")
         container = self.ids.list_container
-        container.clear_widgets()
-        if not result:
+        if not result and self._count == 0:
             container.add_widget(Label(text="ยังไม่มีเรื่องที่เก็บไว้", font_size="16sp"))
             return
-        for s in result:
+        for s in result or []:
             row = BoxLayout(orientation="horizontal", size_hint_y=None, height=72, spacing=8, padding=(8, 4))
-            thumb_url = s.get("first_episode_image_url") or ""
+            thumb_url = _abs_url(s.get("thumbnail_url") or s.get("first_episode_image_url") or "")
             if thumb_url:
                 img = AsyncImage(
                     source=thumb_url,
@@ -394,7 +431,8 @@ class StoryListScreen(Screen):
             btn.bind(on_press=lambda __, story_id=sid: self._open_story(story_id))
             row.add_widget(btn)
             container.add_widget(row)
-        container.height = len(result) * 72 + max(0, len(result) - 1) * 10
+        self._count += len(result or [])
+        container.height = self._count * 72 + max(0, self._count - 1) * 10
 
     def _open_story(self, story_id):
         url = f"{API_BASE}/api/story/{story_id}"
@@ -426,7 +464,7 @@ class StoryViewScreen(Screen):
             ep = eps[self._index]
             self.ids.episode_text.text = ep.get("text", "")
             url = ep.get("imageUrl", "")
-            self.ids.episode_image.source = url if url else ""
+            self.ids.episode_image.source = _abs_url(url, width=768) if url else ""
 
     def next_page(self):
         if not self._data:
@@ -3,10 +3,25 @@ import type {
   GenerateStoryResponse,
   StoryListItem,
   GetStoryResponse,
+  ExportJobResponse,
 } from './types'
 
 const BASE = '/api'
 
+// Stored images (/api/image/{hash}) can be served resized: ?w= picks the nearest standard width,
+// and the browser's Accept header gets AVIF/WebP. Legacy data URLs are returned unchanged.
+const IMAGE_WIDTHS = [256, 512, 768]
+
+export function imageSrc(url: string, width?: number): string {
+  if (!width || !url.startsWith(`${BASE}/image/`)) return url
+  return `${url}?w=${width}`
+}
+
+export function imageSrcSet(url: string): string | undefined {
+  if (!url.startsWith(`${BASE}/image/`)) return undefined
+  return [...IMAGE_WIDTHS.map((w) => `${url}?w=${w} ${w}w`), `${url} 1024w`].join(', ')
+}
+
 export async function generateStory(
   body: GenerateStoryRequest
 ): Promise<GenerateStoryResponse> {
@@ -41,12 +56,30 @@ export async function listStories(
   return res.json()
 }
 
-export async function exportVideo(storyId: string): Promise<Blob> {
+const EXPORT_POLL_MS = 1500
+
+export async function exportVideo(
+  storyId: string,
+  onProgress?: (progress: number) => void
+): Promise<Blob> {
+  // export เป็น job: สร้าง job → poll สถานะ → ดาวน์โหลดไฟล์เมื่อเสร็จ
   const res = await fetch(`${BASE}/story/export-video`, {
     method: 'POST',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ storyId }),
   })
   if (!res.ok) throw new Error('ส่งออกวิดีโอไม่สำเร็จ')
-  return res.blob()
+  let job: ExportJobResponse = await res.json()
+  while (job.status === 'queued' || job.status === 'running') {
+    onProgress?.(job.progress)
+    await new Promise((r) => setTimeout(r, EXPORT_POLL_MS))
+    const poll = await fetch(`${BASE}/story/export-video/${job.jobId}`)
+    if (!poll.ok) throw new Error('ส่งออกวิดีโอไม่สำเร็จ')
+    job = await poll.json()
+  }
+  if (job.status !== 'done' || !job.downloadUrl) throw new Error('ส่งออกวิดีโอไม่สำเร็จ')
+  onProgress?.(1)
+  const file = await fetch(job.downloadUrl)
+  if (!file.ok) throw new Error('ส่งออกวิดีโอไม่สำเร็จ')
+  return file.blob()
 }
@@ -7,6 +7,8 @@ export interface GenerateStoryRequest {
   story_lang?: StoryLang
   image_model?: ImageModel
   image_style?: string | null
+  /** Same seed + same inputs = same story text (served from the server's LLM cache) */
+  seed?: number | null
 }
 
 export interface EpisodeOut {
@@ -27,6 +29,7 @@ export interface StoryListItem {
   num_episodes: number
   created_at: string
   first_episode_image_url?: string | null
+  thumbnail_url?: string | null
 }
 
 export interface GetStoryResponse {
@@ -37,3 +40,12 @@ export interface GetStoryResponse {
   created_at: string
   episodes: EpisodeOut[]
 }
+
+export interface ExportJobResponse {
+  jobId: string
+  storyId: string
+  status: 'queued' | 'running' | 'done' | 'failed'
+  progress: number
+  error?: string | null
+  downloadUrl?: string | null
+}
@@ -1,7 +1,7 @@
 import { useEffect, useState } from 'react'
 import { Link } from 'react-router-dom'
 import { useLang } from '../context/LangContext'
-import { listStories } from '../api/client'
+import { listStories, imageSrc } from '../api/client'
 import type { StoryListItem } from '../api/types'
 
 export default function StoryList() {
@@ -55,7 +55,7 @@ export default function StoryList() {
                 <div className="aspect-[4/3] w-full bg-primary/10 flex items-center justify-center shrink-0">
                   {s.first_episode_image_url ? (
                     <img
-                      src={s.first_episode_image_url}
+                      src={imageSrc(s.first_episode_image_url, 512)}
                       alt=""
                       className="w-full h-full object-cover"
                       loading="lazy"
@@ -1,7 +1,7 @@
 import { useEffect, useState, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import { useLang } from '../context/LangContext'
-import { getStory, exportVideo } from '../api/client'
+import { getStory, exportVideo, imageSrc, imageSrcSet } from '../api/client'
 import type { GetStoryResponse } from '../api/types'
 
 const API_BASE = '/api'
@@ -111,7 +111,9 @@ export default function StoryView() {
         <section className="flex-1 min-h-[200px] sm:min-h-0 flex items-center justify-center rounded-2xl bg-white/80 shadow-lg overflow-hidden border border-primary/20">
           {episode.imageUrl ? (
             <img
-              src={episode.imageUrl}
+              src={imageSrc(episode.imageUrl, 768)}
+              srcSet={imageSrcSet(episode.imageUrl)}
+              sizes="(min-width: 640px) 50vw, 100vw"
               alt={`${t('episodeAlt')} ${index + 1}`}
               className="max-w-full max-h-[50vh] sm:max-h-full object-contain"
             />